@@ -0,0 +1,126 @@
+"""
+Benchmark screen capture throughput on Linux.
+
+Starts a headless Xvfb server for each resolution (through `xvfbwrapper`,
+`pip install xvfbwrapper` and `apt install xvfb`) and reports frames per
+second for the persistent XShm backend and for the previous per-call
+`Xlib.display.Display()` + `ImageGrab.grab` path.
+
+Before measuring, a smoke test checks that the capture used by the agent
+returns frames of the screen's size, and that a grab the server rejects
+(a BadMatch, as after a resolution change) raises instead of exiting the
+process, so the agent can fall back to `ImageGrab`.
+
+    python -m benchmarks.capture_fps
+    python -m benchmarks.capture_fps --resolutions 1920x1080 --frames 200
+    python -m benchmarks.capture_fps --display :0   # measure a real display
+"""
+import argparse
+import os
+import time
+
+import Xlib.display
+from PIL import ImageGrab
+
+from operate.utils.x11_capture import X11ShmCapture
+
+
+def smoke_test(display):
+    """
+    Checks the agent's capture path on a display, raising AssertionError on failure.
+    """
+    os.environ["DISPLAY"] = display
+    # pyautogui, imported by the agent's capture module, needs a display to import
+    from operate.utils import screenshot
+
+    # Start from a fresh capture state, as a new agent process would
+    screenshot._x11_capture = screenshot._x11_display = None
+    frame = screenshot.capture_screen_with_cursor()
+    capture = screenshot._x11_capture
+    assert capture is not None, "XShm backend did not attach"
+    assert frame.size == (capture.width, capture.height), f"unexpected frame size {frame.size}"
+
+    # Ask for more pixels than the root window has, the server answers BadMatch
+    capture._ximage.contents.width += 16
+    try:
+        capture.grab()
+    except OSError:
+        pass
+    else:
+        raise AssertionError("a rejected grab did not raise")
+    finally:
+        capture._ximage.contents.width -= 16
+
+    # The agent re-attaches and keeps capturing
+    capture._ximage.contents.width += 16
+    frame = screenshot.capture_screen_with_cursor()
+    assert frame.size == (capture.width, capture.height), "no frame after a rejected grab"
+    screenshot._x11_capture.close()
+    screenshot._x11_capture = screenshot._x11_display = None
+    print(f"[{display}] smoke test passed: {frame.width}x{frame.height} frames, BadMatch handled")
+
+
+def measure(grab, frames):
+    grab()  # exclude one-time setup from the measurement
+    start = time.perf_counter()
+    for _ in range(frames):
+        grab()
+    return frames / (time.perf_counter() - start)
+
+
+def imagegrab_per_call():
+    screen = Xlib.display.Display().screen()
+    size = screen.width_in_pixels, screen.height_in_pixels
+    return ImageGrab.grab(bbox=(0, 0, size[0], size[1]))
+
+
+def run(display, frames):
+    os.environ["DISPLAY"] = display
+    capture = X11ShmCapture(display)
+    try:
+        results = {
+            "xshm grab (shared buffer)": measure(capture.grab, frames),
+            "xshm grab_image (RGB frame)": measure(capture.grab_image, frames),
+            "ImageGrab + new Display": measure(imagegrab_per_call, frames),
+        }
+        size = f"{capture.width}x{capture.height}"
+    finally:
+        capture.close()
+
+    print(f"[{size}] {frames} frames")
+    for name, fps in results.items():
+        print(f"  {name:<30} {fps:8.1f} fps  {1000 / fps:7.2f} ms/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark X11 screen capture FPS.")
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        default=["1920x1080", "3840x2160"],
+        help="Xvfb screen sizes to benchmark",
+    )
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument(
+        "--display",
+        help="Benchmark an existing display instead of starting Xvfb",
+    )
+    args = parser.parse_args()
+
+    if args.display:
+        smoke_test(args.display)
+        run(args.display, args.frames)
+        return
+
+    from xvfbwrapper import Xvfb
+
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        with Xvfb(width=width, height=height, colordepth=24) as xvfb:
+            display = f":{xvfb.new_display}"
+            smoke_test(display)
+            run(display, args.frames)
+
+
+if __name__ == "__main__":
+    main()
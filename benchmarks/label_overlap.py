@@ -0,0 +1,74 @@
+"""
+Microbenchmark of set-of-marks overlap suppression: checking every detection
+against all the boxes labeled so far, as the labeling step did before, against
+the `BoxGrid` index behind `select_non_overlapping`.
+
+Synthetic detections mix small icons, buttons and text fields with a few
+large panels, like a busy dashboard or IDE. For each count it checks that
+both give the same labels in the same order.
+
+    python -m benchmarks.label_overlap
+    python -m benchmarks.label_overlap --boxes 1000 5000 --repeat 10
+"""
+import argparse
+import random
+import time
+
+from operate.utils.label import is_overlapping, select_non_overlapping
+
+WIDTH, HEIGHT = 2560, 1440
+
+
+def synthetic_detections(count, seed=0):
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.02:
+            w, h = rng.uniform(300, 1200), rng.uniform(200, 800)  # panel
+        elif kind < 0.5:
+            w, h = rng.uniform(12, 40), rng.uniform(12, 40)  # icon
+        else:
+            w, h = rng.uniform(40, 240), rng.uniform(16, 48)  # button or field
+        x = rng.uniform(0, WIDTH - w)
+        y = rng.uniform(0, HEIGHT - h)
+        boxes.append((x, y, x + w, y + h))
+    # YOLO returns detections by decreasing confidence, unrelated to position
+    return boxes
+
+
+def quadratic(boxes):
+    drawn_boxes = []
+    for box in boxes:
+        if not any(is_overlapping(box, drawn) for drawn in drawn_boxes):
+            drawn_boxes.append(box)
+    return drawn_boxes
+
+
+def timed(function, boxes, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        kept = function(boxes)
+    return (time.perf_counter() - start) / repeat, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark set-of-marks overlap suppression.")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[100, 500, 1000, 2000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6} {'labels':>7} {'quadratic':>11} {'grid':>9} {'speed-up':>9}")
+    for count in args.boxes:
+        boxes = synthetic_detections(count)
+        quadratic_seconds, expected = timed(quadratic, boxes, args.repeat)
+        grid_seconds, kept = timed(select_non_overlapping, boxes, args.repeat)
+        assert kept == expected, f"label sets differ for {count} boxes"
+        print(
+            f"{count:>6} {len(kept):>7} {quadratic_seconds * 1000:9.2f}ms "
+            f"{grid_seconds * 1000:7.2f}ms {quadratic_seconds / grid_seconds:8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Compare OCR backends on a fixture set of screenshots.
+
+Every backend runs in its own subprocess so its peak RSS is measured in
+isolation. For each backend it reports the model load time, per-frame
+latency (after one warm-up read), the peak RSS and how many grounding
+targets were found, using the same local matching the agent uses (exact,
+phrase or fuzzy match at `config.ocr_match_threshold`).
+
+Without arguments a synthetic fixture set with known targets is generated.
+Real screenshots take their targets from a JSON file mapping each image's
+file name to the texts a model would ask to click:
+
+    python -m benchmarks.ocr_backends
+    python -m benchmarks.ocr_backends screenshots/*.png --targets targets.json
+    python -m benchmarks.ocr_backends --backends easyocr tesseract
+
+Tesseract needs `pip install pytesseract` and the `tesseract` binary,
+RapidOCR needs `pip install rapidocr_onnxruntime`.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from operate.config import Config
+from operate.models.ocr_backends import BACKENDS, create_backend
+from operate.utils.text_index import OCRTextIndex
+
+# Load configuration
+config = Config()
+
+LABELS = [
+    "Sign in", "Settings", "Save changes", "Cancel", "Open file", "Downloads",
+    "New tab", "Search", "Compose", "Inbox", "Preferences", "Log out",
+    "Add to cart", "Checkout", "Documents", "Recent", "Share", "Export as PDF",
+]
+
+
+def synthetic_fixtures(directory, count=4, width=1920, height=1080, seed=0):
+    """
+    Draws UI-like frames: labels in boxes of several sizes and shades.
+
+    Returns:
+        dict: Maps each image path to the labels drawn on it.
+    """
+    rng = random.Random(seed)
+    fonts = []
+    for size in (14, 18, 24):
+        try:
+            fonts.append(ImageFont.truetype("DejaVuSans.ttf", size))
+        except OSError:
+            fonts.append(ImageFont.load_default())
+
+    fixtures = {}
+    for index in range(count):
+        image = Image.new("RGB", (width, height), (245, 245, 245))
+        draw = ImageDraw.Draw(image)
+        labels = rng.sample(LABELS, 12)
+        for row, label in enumerate(labels):
+            x = rng.randint(40, width - 400)
+            y = 60 + row * (height - 120) // len(labels)
+            font = rng.choice(fonts)
+            shade = rng.choice([(255, 255, 255), (220, 230, 245), (40, 90, 200)])
+            text_color = "white" if shade == (40, 90, 200) else "black"
+            left, top, right, bottom = draw.textbbox((x, y), label, font=font)
+            draw.rectangle((left - 10, top - 6, right + 10, bottom + 6), fill=shade, outline="gray")
+            draw.text((x, y), label, fill=text_color, font=font)
+        path = os.path.join(directory, f"fixture_{index}.png")
+        image.save(path)
+        fixtures[path] = labels
+    return fixtures
+
+
+def target_found(result, target, threshold):
+    text_index = OCRTextIndex(result)
+    if text_index.find(target):
+        return True
+    ranked = text_index.search(target)
+    return bool(ranked) and ranked[0][1] >= threshold
+
+
+def run_backend(backend, fixtures):
+    """
+    Runs one backend over the fixtures in this process and returns its measurements.
+    """
+    threshold = config.ocr_match_threshold
+    start = time.perf_counter()
+    reader = create_backend(backend)
+    load_seconds = time.perf_counter() - start
+
+    frames = {path: np.asarray(Image.open(path).convert("RGB")) for path in fixtures}
+    reader.readtext(next(iter(frames.values())))  # warm-up
+
+    latencies = []
+    found = 0
+    targets = 0
+    for path, pixels in frames.items():
+        start = time.perf_counter()
+        result = reader.readtext(pixels)
+        latencies.append(time.perf_counter() - start)
+        for target in fixtures[path]:
+            targets += 1
+            found += target_found(result, target, threshold)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "mean_seconds": float(np.mean(latencies)),
+        "p95_seconds": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": peak_rss / 2**20,
+        "found": found,
+        "targets": targets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR backends.")
+    parser.add_argument("images", nargs="*", help="Screenshots (default: synthetic fixtures)")
+    parser.add_argument("--targets", help="JSON file mapping image file names to target texts")
+    parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.fixtures) as file:
+            fixtures = json.load(file)
+        print(json.dumps(run_backend(args.worker, fixtures)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.images:
+            targets = {}
+            if args.targets:
+                with open(args.targets) as file:
+                    targets = json.load(file)
+            fixtures = {path: targets.get(os.path.basename(path), []) for path in args.images}
+        else:
+            fixtures = synthetic_fixtures(directory)
+        fixtures_path = os.path.join(directory, "fixtures.json")
+        with open(fixtures_path, "w") as file:
+            json.dump(fixtures, file)
+
+        print(f"{len(fixtures)} frames, {sum(map(len, fixtures.values()))} targets")
+        print(
+            f"{'backend':<10} {'load':>7} {'mean/frame':>11} {'p95/frame':>10} "
+            f"{'peak RSS':>10} {'targets found':>14}"
+        )
+        for backend in args.backends:
+            process = subprocess.run(
+                [sys.executable, "-m", "benchmarks.ocr_backends", "--worker", backend, "--fixtures", fixtures_path],
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+                print(f"{backend:<10} skipped: {error}")
+                continue
+            row = json.loads(process.stdout.strip().splitlines()[-1])
+            print(
+                f"{backend:<10} {row['load_seconds']:6.2f}s {row['mean_seconds']:10.3f}s "
+                f"{row['p95_seconds']:9.3f}s {row['peak_rss_mb']:8.0f}MB "
+                f"{row['found']:>6}/{row['targets']:<7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
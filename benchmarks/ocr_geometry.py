@@ -0,0 +1,104 @@
+"""
+Microbenchmark of OCR box geometry: the per-box list comprehensions used
+before against the array-backed `OCRResult`, on synthetic frames with many
+text boxes.
+
+For each box count it times converting the raw EasyOCR output once, then
+computing every box's percent center, and looking up one element's center.
+
+    python -m benchmarks.ocr_geometry
+    python -m benchmarks.ocr_geometry --boxes 500 2000 --repeat 200
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from operate.models.ocr_result import OCRResult
+
+WIDTH, HEIGHT = 3840, 2160
+
+
+def synthetic_result(count, seed=0):
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        x = rng.randint(0, WIDTH - 200)
+        y = rng.randint(0, HEIGHT - 30)
+        w = rng.randint(20, 200)
+        h = rng.randint(12, 30)
+        box = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        result.append((box, f"text {i}", rng.random()))
+    return result
+
+
+def list_centers(result):
+    centers = []
+    for box, _, _ in result:
+        min_x = min([coord[0] for coord in box])
+        max_x = max([coord[0] for coord in box])
+        min_y = min([coord[1] for coord in box])
+        max_y = max([coord[1] for coord in box])
+        centers.append(
+            (round((min_x + max_x) / 2 / WIDTH, 3), round((min_y + max_y) / 2 / HEIGHT, 3))
+        )
+    return centers
+
+
+def list_center(result, index):
+    box = result[index][0]
+    min_x = min([coord[0] for coord in box])
+    max_x = max([coord[0] for coord in box])
+    min_y = min([coord[1] for coord in box])
+    max_y = max([coord[1] for coord in box])
+    return round((min_x + max_x) / 2 / WIDTH, 3), round((min_y + max_y) / 2 / HEIGHT, 3)
+
+
+def time_call(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR box geometry.")
+    parser.add_argument("--boxes", nargs="+", type=int, default=[500, 1000, 2000, 5000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6} {'operation':<16} {'lists (us)':>11} {'arrays (us)':>12} {'speed-up':>9}")
+    for count in args.boxes:
+        raw = synthetic_result(count)
+        ocr_result = OCRResult(raw)
+        index = count // 2
+        assert list_center(raw, index) == ocr_result.percent_center(index, (WIDTH, HEIGHT))
+        # Sanity check: both paths agree (up to the last digit on exact halves,
+        # which `round` and `np.round` break differently)
+        assert np.allclose(
+            list_centers(raw), ocr_result.percent_centers((WIDTH, HEIGHT)), atol=1.001e-3
+        )
+
+        rows = [
+            ("convert once", None, time_call(lambda: OCRResult(raw), args.repeat)),
+            (
+                "all centers",
+                time_call(lambda: list_centers(raw), args.repeat),
+                time_call(lambda: ocr_result.percent_centers((WIDTH, HEIGHT)), args.repeat),
+            ),
+            (
+                "one center",
+                time_call(lambda: list_center(raw, index), args.repeat),
+                time_call(lambda: ocr_result.percent_center(index, (WIDTH, HEIGHT)), args.repeat),
+            ),
+        ]
+        for name, lists, arrays in rows:
+            if lists is None:
+                print(f"{count:>6} {name:<16} {'':>11} {arrays:>12.1f} {'':>9}")
+            else:
+                print(f"{count:>6} {name:<16} {lists:>11.1f} {arrays:>12.1f} {lists / arrays:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
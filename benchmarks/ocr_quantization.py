@@ -0,0 +1,95 @@
+"""
+Compare the EasyOCR recognizer in fp32 and with dynamic int8 quantization on CPU.
+
+Reports load time, per-frame latency, grounding targets found and how many of
+the fp32 texts the int8 recognizer reproduces exactly, on the synthetic
+fixture set of `benchmarks.ocr_backends` or on given screenshots. The int8
+recognizer is loaded twice into an empty cache directory: first quantized and
+saved, then read back from the cache as later runs do.
+
+    python -m benchmarks.ocr_quantization
+    python -m benchmarks.ocr_quantization screenshots/*.png --targets targets.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.ocr_backends import synthetic_fixtures, target_found
+from operate.config import Config
+from operate.models.ocr_backends import EasyOCRBackend
+
+# Load configuration
+config = Config()
+
+
+def run(quantize, frames, fixtures):
+    start = time.perf_counter()
+    backend = EasyOCRBackend(quantize=quantize)
+    load_seconds = time.perf_counter() - start
+    backend.readtext(next(iter(frames.values())))  # warm-up
+
+    latencies = []
+    results = {}
+    found = 0
+    for path, pixels in frames.items():
+        start = time.perf_counter()
+        results[path] = backend.readtext(pixels)
+        latencies.append(time.perf_counter() - start)
+        found += sum(
+            target_found(results[path], target, config.ocr_match_threshold)
+            for target in fixtures[path]
+        )
+    return load_seconds, float(np.mean(latencies)), found, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 EasyOCR recognizers.")
+    parser.add_argument("images", nargs="*", help="Screenshots (default: synthetic fixtures)")
+    parser.add_argument("--targets", help="JSON file mapping image file names to target texts")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.images:
+            targets = {}
+            if args.targets:
+                with open(args.targets) as file:
+                    targets = json.load(file)
+            fixtures = {path: targets.get(os.path.basename(path), []) for path in args.images}
+        else:
+            fixtures = synthetic_fixtures(directory)
+        frames = {path: np.asarray(Image.open(path).convert("RGB")) for path in fixtures}
+
+        total_targets = sum(map(len, fixtures.values()))
+        config.cache_dir = os.path.join(directory, "cache")
+        rows = {
+            "fp32": run(False, frames, fixtures),
+            "int8 build": run(True, frames, fixtures),
+            "int8 cached": run(True, frames, fixtures),
+        }
+
+    fp32_texts = [element[1] for result in rows["fp32"][3].values() for element in result]
+    int8_texts = [element[1] for result in rows["int8 cached"][3].values() for element in result]
+    remaining = list(int8_texts)
+    agreed = 0
+    for text in fp32_texts:
+        if text in remaining:
+            remaining.remove(text)
+            agreed += 1
+
+    print(f"{len(frames)} frames, {total_targets} targets")
+    print(f"{'recognizer':<12} {'load':>7} {'mean/frame':>11} {'targets found':>14}")
+    for name, (load_seconds, mean_seconds, found, _) in rows.items():
+        print(f"{name:<12} {load_seconds:6.2f}s {mean_seconds:10.3f}s {found:>7}/{total_targets}")
+    print(
+        f"speed-up {rows['fp32'][1] / rows['int8 cached'][1]:.2f}x, "
+        f"{agreed}/{len(fp32_texts)} fp32 texts reproduced exactly by int8"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Check and time region-hinted OCR grounding against the full-frame pass.
+
+Draws a 4K frame of UI labels and grounds a hinted click on it as the first
+step of a session, with the default prefetch setting. It checks that the click
+is grounded by `read_region` alone (no full-frame read) and lands on the
+target, then grounds the same click without a hint and reports both timings.
+
+    python -m benchmarks.ocr_regions
+    python -m benchmarks.ocr_regions --backend rapidocr --size 2560x1440
+"""
+import argparse
+import asyncio
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.ocr_backends import LABELS
+from operate.config import Config
+from operate.models.detector import get_som_detector
+from operate.models.ocr_reader import create_ocr_job, get_ocr_reader, get_ocr_stats
+from operate.utils.ocr import ground_operations
+
+# Load configuration
+config = Config()
+
+TARGET = "Export as PDF"
+TARGET_POSITION = (0.7, 0.8)
+
+
+def synthetic_frame(width, height):
+    """
+    Draws a grid of labels with `TARGET` at `TARGET_POSITION`.
+
+    Returns:
+        tuple: The image and the target's `(x0, y0, x1, y1)` box in pixels.
+    """
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 22)
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("RGB", (width, height), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    fillers = [label for label in LABELS if label != TARGET]
+    columns, rows = 8, 24
+    for row in range(rows):
+        for column in range(columns):
+            x = 40 + column * (width - 80) // columns
+            y = 40 + row * (height - 80) // rows
+            label = fillers[(row * columns + column) % len(fillers)]
+            draw.text((x, y), label, fill="black", font=font)
+
+    x, y = TARGET_POSITION[0] * width, TARGET_POSITION[1] * height
+    box = draw.textbbox((x, y), TARGET, font=font)
+    draw.rectangle((box[0] - 10, box[1] - 6, box[2] + 10, box[3] + 6), fill="white", outline="gray")
+    draw.text((x, y), TARGET, fill="black", font=font)
+    return image, box
+
+
+def ground(operation, ocr_job, screenshot):
+    start = time.perf_counter()
+    asyncio.run(ground_operations([operation], ocr_job, screenshot))
+    return time.perf_counter() - start
+
+
+def assert_on_target(operation, box, size):
+    x, y = operation["x"] * size[0], operation["y"] * size[1]
+    assert box[0] <= x <= box[2] and box[1] <= y <= box[3], (
+        f"click at ({x:.0f}, {y:.0f}) is not on '{TARGET}' at {box}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time region-hinted OCR.")
+    parser.add_argument("--backend", help="OCR backend (default: config.ocr_backend)")
+    parser.add_argument("--size", default="3840x2160", help="Frame size, WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    # Imported here: the capture module needs a display, which drawing a frame does not
+    from operate.utils.screenshot import Screenshot
+
+    # After every import, since each module's `Config()` resets the settings
+    if args.backend:
+        config.ocr_backend = args.backend
+
+    width, height = map(int, args.size.split("x"))
+    image, box = synthetic_frame(width, height)
+    screenshot = Screenshot(image)
+    # Load the models outside of the timings
+    get_ocr_reader()
+    if config.ocr_element_map:
+        get_som_detector()
+
+    # First step of a session, as the agent runs it
+    hinted = {
+        "operation": "click",
+        "text": TARGET,
+        "region": {"x": str(TARGET_POSITION[0] + 0.02), "y": str(TARGET_POSITION[1] + 0.01)},
+    }
+    region_seconds = ground(hinted, create_ocr_job(screenshot), screenshot)
+    stats = get_ocr_stats()
+    assert stats["frame_reads"] == 0, "the hinted click read the full frame"
+    assert stats["region_reads"] >= 1 and stats["steps_region_only"] == 1, stats
+    assert_on_target(hinted, box, screenshot.size)
+
+    plain = {"operation": "click", "text": TARGET}
+    frame_seconds = ground(plain, create_ocr_job(screenshot), screenshot)
+    assert get_ocr_stats()["frame_reads"] == 1
+    assert_on_target(plain, box, screenshot.size)
+
+    print(f"{width}x{height} frame, {config.ocr_backend}, prefetch {config.ocr_prefetch}")
+    print(
+        f"first step grounded by {stats['region_reads']} region read(s), "
+        "no full-frame read: ok"
+    )
+    print(f"{'path':<11} {'grounding':>10}")
+    print(f"{'region':<11} {region_seconds:9.2f}s")
+    print(f"{'full frame':<11} {frame_seconds:9.2f}s")
+    print(f"speed-up {frame_seconds / region_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
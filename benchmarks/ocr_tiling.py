@@ -0,0 +1,94 @@
+"""
+Benchmark tiled multi-process OCR against a single full-frame `readtext`.
+
+Runs on the given screenshots, or on a synthetic 4K frame full of text, and
+reports latency, speed-up and how many of the single-pass texts the tiled
+pass also found, for each worker count.
+
+    python -m benchmarks.ocr_tiling
+    python -m benchmarks.ocr_tiling screenshots/*.png --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+import easyocr
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from operate.models.ocr_tiles import TiledOCR
+
+
+def synthetic_frame(width=3840, height=2160, seed=0):
+    """
+    Draws rows of random words, roughly the density of a busy IDE or dashboard.
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 22)
+    except OSError:
+        font = ImageFont.load_default()
+    for y in range(20, height - 40, 48):
+        x = 20
+        while x < width - 300:
+            word = "".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(3, 10)))
+            draw.text((x, y), word, fill="black", font=font)
+            x += rng.randint(160, 420)
+    return image
+
+
+def time_call(function, frame, repeat):
+    function(frame)  # warm-up, excludes model loading
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(frame)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tiled multi-process OCR.")
+    parser.add_argument("images", nargs="*", help="Screenshots to read (default: synthetic 4K)")
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.images:
+        frames = [np.asarray(Image.open(path).convert("RGB")) for path in args.images]
+    else:
+        frames = [np.asarray(synthetic_frame())]
+
+    reader = easyocr.Reader(["en"], gpu=False)
+    for index, frame in enumerate(frames):
+        height, width = frame.shape[:2]
+        baseline_seconds, baseline = time_call(reader.readtext, frame, args.repeat)
+        baseline_texts = {element[1] for element in baseline}
+        print(f"[frame {index}] {width}x{height}, {len(baseline)} boxes")
+        print(f"  {'single readtext':<18} {baseline_seconds:7.2f}s")
+
+        for workers in args.workers:
+            tiled = TiledOCR(workers)
+            try:
+                tiled.warm_up()
+                seconds, result = time_call(tiled.read, frame, args.repeat)
+            finally:
+                tiled.close()
+            found = len(baseline_texts & {element[1] for element in result})
+            print(
+                f"  {f'tiled x{workers}':<18} {seconds:7.2f}s  "
+                f"speed-up {baseline_seconds / seconds:4.2f}x  "
+                f"{len(result)} boxes, {found}/{len(baseline_texts)} texts matched, "
+                f"pool start {tiled.stats['pool_start_seconds']:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compare the set-of-marks detector on ultralytics (PyTorch eager) against the
+ONNX Runtime export, in fp32 and with int8 weights.
+
+Every runtime runs in its own subprocess so its peak RSS (including what
+importing torch costs) is measured in isolation. For each runtime it reports
+the load time, per-frame latency after the warm-up, the peak RSS, how many of
+the ultralytics boxes it reproduces (IoU >= 0.9) and on how many frames
+labeled mode would draw exactly the same labels. The ONNX models are
+exported from the checkpoint first, so load times do not include the export.
+
+Without arguments the synthetic UI frames of `benchmarks.ocr_backends` are used:
+
+    python -m benchmarks.som_detector
+    python -m benchmarks.som_detector screenshots/*.png --weights best.pt
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.ocr_backends import synthetic_fixtures
+from operate.models.detector import create_som_detector, export_som_onnx, get_som_weights_path
+from operate.utils.label import select_non_overlapping
+
+RUNTIMES = {
+    "ultralytics": ("ultralytics", False),
+    "onnx": ("onnx", False),
+    "onnx-int8": ("onnx", True),
+}
+
+
+def run_runtime(runtime, weights_path, paths):
+    backend, quantize = RUNTIMES[runtime]
+    start = time.perf_counter()
+    detector = create_som_detector(weights_path, backend, quantize)
+    load_seconds = time.perf_counter() - start
+
+    frames = [Image.open(path).convert("RGB") for path in paths]
+    latencies = []
+    boxes = []
+    for frame in frames:
+        start = time.perf_counter()
+        boxes.append(detector.detect(frame))
+        latencies.append(time.perf_counter() - start)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+    return {
+        "load_seconds": load_seconds,
+        "mean_seconds": float(np.mean(latencies)),
+        "p95_seconds": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": peak_rss / 2**20,
+        "boxes": boxes,
+    }
+
+
+def iou(a, b):
+    width = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union else 0.0
+
+
+def matched(reference, boxes, threshold=0.9):
+    remaining = list(boxes)
+    count = 0
+    for box in reference:
+        best = max(remaining, key=lambda other: iou(box, other), default=None)
+        if best is not None and iou(box, best) >= threshold:
+            remaining.remove(best)
+            count += 1
+    return count
+
+
+def same_labels(reference, boxes):
+    def labels(frame_boxes):
+        return [tuple(round(v) for v in box) for box in select_non_overlapping(frame_boxes)]
+
+    return labels(reference) == labels(boxes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare set-of-marks detector runtimes.")
+    parser.add_argument("images", nargs="*", help="Screenshots (default: synthetic frames)")
+    parser.add_argument("--weights", help="YOLO checkpoint (default: the bundled best.pt)")
+    parser.add_argument("--runtimes", nargs="+", default=list(RUNTIMES), choices=list(RUNTIMES))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--paths", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    weights_path = args.weights or get_som_weights_path()
+
+    if args.worker:
+        with open(args.paths) as file:
+            paths = json.load(file)
+        print(json.dumps(run_runtime(args.worker, weights_path, paths)))
+        return
+
+    for runtime in args.runtimes:
+        backend, quantize = RUNTIMES[runtime]
+        if backend == "onnx":
+            export_som_onnx(weights_path, quantize)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = args.images or list(synthetic_fixtures(directory))
+        paths_file = os.path.join(directory, "paths.json")
+        with open(paths_file, "w") as file:
+            json.dump(paths, file)
+
+        rows = {}
+        for runtime in args.runtimes:
+            process = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.som_detector", "--worker", runtime,
+                    "--paths", paths_file, "--weights", weights_path,
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+                print(f"{runtime:<12} skipped: {error}")
+                continue
+            rows[runtime] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    print(f"{len(paths)} frames")
+    print(
+        f"{'runtime':<12} {'load':>7} {'mean/frame':>11} {'p95/frame':>10} "
+        f"{'peak RSS':>10} {'boxes matched':>14} {'same labels':>12}"
+    )
+    reference = rows.get("ultralytics")
+    for runtime, row in rows.items():
+        agreement = ""
+        if reference:
+            total = sum(map(len, reference["boxes"]))
+            found = sum(map(matched, reference["boxes"], row["boxes"]))
+            frames = sum(map(same_labels, reference["boxes"], row["boxes"]))
+            agreement = f"{found:>7}/{total:<6} {frames:>6}/{len(paths):<5}"
+        print(
+            f"{runtime:<12} {row['load_seconds']:6.2f}s {row['mean_seconds']:10.3f}s "
+            f"{row['p95_seconds']:9.3f}s {row['peak_rss_mb']:8.0f}MB {agreement}"
+        )
+
+
+if __name__ == "__main__":
+    main()
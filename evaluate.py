@@ -119,9 +119,11 @@ def evaluate_final_screenshot(guideline):
 def run_test_case(objective, guideline, model):
     """Returns True if the result of the test with the given prompt meets the given guideline for the given model."""
     # Run `operate` with the model to evaluate and the test case prompt
+    # Frames are kept in memory unless asked for, and we need the final one on disk
     subprocess.run(
         ["operate", "-m", model, "--prompt", f'"{objective}"'],
         stdout=subprocess.DEVNULL,
+        env={**os.environ, "OPERATE_SAVE_SCREENSHOTS": "1"},
     )
 
     try:
@@ -4,7 +4,7 @@ import sys
 import google.generativeai as genai
 from dotenv import load_dotenv
 from ollama import Client
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import anthropic
 from prompt_toolkit.shortcuts import input_dialog
 
@@ -18,6 +18,8 @@ class Config:
         openai_api_key (str): API key for OpenAI.
         google_api_key (str): API key for Google.
         ollama_host (str): url to ollama running remotely.
+        save_screenshots (bool): Also write each captured frame to `screenshots/`.
+        settle_limits (dict): Per-operation-type limits for waiting until the screen is stable.
     """
 
     _instance = None
@@ -46,6 +48,62 @@ class Config:
         self.qwen_api_key = (
             None  # instance variables are backups in case saving to a `.env` fails
         )
+        # Frames stay in memory; persisting them is opt-in (e.g. for `evaluate.py`)
+        self.save_screenshots = os.getenv("OPERATE_SAVE_SCREENSHOTS", "0") == "1"
+        # Write set-of-marks renders (labeled, debug overlay, original) to `labeled_images/`
+        self.save_label_artifacts = os.getenv("OPERATE_SAVE_LABEL_ARTIFACTS", "0") == "1"
+        # How long to wait for the screen to stop changing after each kind of operation.
+        # `stable_frames` consecutive matching frames end the wait early; `min_delay`
+        # gives the UI time to start reacting before the first frame is taken.
+        self.settle_limits = {
+            "default": {"stable_frames": 2, "interval": 0.1, "timeout": 1.0, "min_delay": 0.0},
+            "click": {"timeout": 2.0, "min_delay": 0.2},
+            "drag": {"timeout": 2.0, "min_delay": 0.2},
+            "press": {"timeout": 3.0, "min_delay": 0.3},  # hotkeys often open apps or new pages
+            "write": {"timeout": 1.0, "min_delay": 0.1},
+        }
+        # Fraction of signature cells allowed to differ between two "equal" frames
+        self.settle_tolerance = 0.002
+        # OCR engine: "easyocr" (default), "tesseract" or "rapidocr", see `ocr_backends`
+        self.ocr_backend = os.getenv("OPERATE_OCR_BACKEND", "easyocr")
+        # Run the EasyOCR recognizer with int8 weights on CPU, built once into `cache_dir`
+        self.ocr_quantize = os.getenv("OPERATE_OCR_QUANTIZE", "0") == "1"
+        # Where models built from the bundled weights are kept between runs
+        self.cache_dir = os.getenv(
+            "OPERATE_CACHE_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "self-operating-computer"),
+        )
+        # Set-of-marks detector runtime: "ultralytics" or "onnx". The ONNX model is built
+        # from `best.pt` once, into `cache_dir`, with `operate --export-detector`
+        self.som_backend = os.getenv("OPERATE_SOM_BACKEND", "ultralytics")
+        # Use the ONNX detector with dynamically quantized int8 weights
+        self.som_quantize = os.getenv("OPERATE_SOM_QUANTIZE", "0") == "1"
+        # Run the set-of-marks detector alongside full-frame OCR when grounding text, so
+        # the text can be joined to the controls it sits on, see `element_map`
+        self.ocr_element_map = os.getenv("OPERATE_OCR_ELEMENT_MAP", "1") == "1"
+        # Only re-run OCR on the screen tiles that changed since the previous step
+        self.ocr_incremental = os.getenv("OPERATE_OCR_INCREMENTAL", "1") == "1"
+        self.ocr_tile_size = int(os.getenv("OPERATE_OCR_TILE_SIZE", "128"))
+        # Number of OCR results kept, keyed by frame content (0 disables the cache)
+        self.ocr_cache_size = int(os.getenv("OPERATE_OCR_CACHE_SIZE", "16"))
+        # Number of region OCR results kept, separate so region probes never evict frames
+        self.ocr_region_cache_size = int(os.getenv("OPERATE_OCR_REGION_CACHE_SIZE", "8"))
+        # Start OCR while the model is answering: "auto", "always" or "never"
+        self.ocr_prefetch = os.getenv("OPERATE_OCR_PREFETCH", "auto")
+        # Split frames of at least `ocr_tiled_min_pixels` over this many OCR processes
+        self.ocr_workers = int(os.getenv("OPERATE_OCR_WORKERS", "0"))
+        self.ocr_tiled_min_pixels = int(
+            os.getenv("OPERATE_OCR_TILED_MIN_PIXELS", str(2560 * 1440))
+        )
+        # Local fuzzy matches scoring at least this (0-1) skip the LLM lookup
+        self.ocr_match_threshold = float(os.getenv("OPERATE_OCR_MATCH_THRESHOLD", "0.8"))
+        # Lead the best duplicate match needs over the runner-up to skip the LLM tiebreak
+        self.ocr_rank_margin = float(os.getenv("OPERATE_OCR_RANK_MARGIN", "0.1"))
+        # Seconds a step may spend asking the LLM to ground ambiguous targets, retries included
+        self.grounding_timeout = float(os.getenv("OPERATE_GROUNDING_TIMEOUT", "15"))
+        # Crop sizes (fractions of the screen) tried around a model's region hint
+        # before falling back to OCR on the full frame
+        self.ocr_region_scales = (0.25, 0.5)
 
     def initialize_openai(self):
         if self.verbose:
@@ -69,6 +127,21 @@ class Config:
         client.base_url = os.getenv("OPENAI_API_BASE_URL", client.base_url)
         return client
 
+    def initialize_openai_async(self):
+        """
+        Same as `initialize_openai` but returns an `AsyncOpenAI` client, for calls made
+        from inside the event loop.
+        """
+        if self.verbose:
+            print("[Config][initialize_openai_async]")
+
+        api_key = self.openai_api_key or os.getenv("OPENAI_API_KEY")
+        client = AsyncOpenAI(
+            api_key=api_key,
+        )
+        client.base_url = os.getenv("OPENAI_API_BASE_URL", client.base_url)
+        return client
+
     def initialize_qwen(self):
         if self.verbose:
             print("[Config][initialize_qwen]")
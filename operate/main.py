@@ -40,8 +40,21 @@ def main_entry():
         required=False,
     )
 
+    # Build the ONNX set-of-marks detector once, ahead of the first labeled step
+    parser.add_argument(
+        "--export-detector",
+        help="Export the set-of-marks detector to ONNX (int8 with OPERATE_SOM_QUANTIZE=1) and exit",
+        action="store_true",
+    )
+
     try:
         args = parser.parse_args()
+        if args.export_detector:
+            from operate.config import Config
+            from operate.models.detector import export_som_onnx, get_som_weights_path
+
+            print(export_som_onnx(get_som_weights_path(), Config().som_quantize))
+            return
         main(
             args.model,
             terminal_prompt=args.prompt,
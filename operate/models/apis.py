@@ -1,30 +1,27 @@
-import base64
-import io
 import json
 import os
-import time
 import traceback
 
-import easyocr
 import ollama
-import pkg_resources
-from PIL import Image
-from ultralytics import YOLO
 
 from operate.config import Config
 from operate.exceptions import ModelNotRecognizedException
+from operate.models.detector import get_som_detector
+from operate.models.ocr_reader import create_ocr_job
 from operate.models.prompts import (
     get_system_prompt,
     get_user_first_message_prompt,
     get_user_prompt,
 )
+from operate.utils.element_map import build_element_map
 from operate.utils.label import (
-    add_labels,
+    draw_labels,
     get_click_position_in_percent,
+    get_drag_drop_positions,
     get_label_coordinates,
 )
-from operate.utils.ocr import get_text_coordinates, get_text_element, get_drag_drop_text_coordinates
-from operate.utils.screenshot import capture_screen_with_cursor, compress_screenshot
+from operate.utils.ocr import ground_operations
+from operate.utils.settle import wait_for_screen_settle
 from operate.utils.style import ANSI_BRIGHT_MAGENTA, ANSI_GREEN, ANSI_RED, ANSI_RESET
 
 # Load configuration
@@ -68,19 +65,11 @@ async def get_next_action(model, messages, objective, session_id):
 def call_gpt_4o(messages):
     if config.verbose:
         print("[call_gpt_4_v]")
-    time.sleep(1)
     client = config.initialize_openai()
     try:
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
-
-        with open(screenshot_filename, "rb") as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode("utf-8")
+        screenshot = capture_screenshot()
+        img_base64 = screenshot.to_base64()
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -149,24 +138,16 @@ async def call_qwen_vl_with_ocr(messages, objective, model):
 
     # Construct the path to the file within the package
     try:
-        time.sleep(1)
         client = config.initialize_qwen()
 
         confirm_system_prompt(messages, objective, model)
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
         # Call the function to capture the screen with the cursor
-        raw_screenshot_filename = os.path.join(screenshots_dir, "raw_screenshot.png")
-        capture_screen_with_cursor(raw_screenshot_filename)
+        screenshot = capture_screenshot()
+        # OCR may start now to overlap the model request, it only runs if needed
+        ocr_job = create_ocr_job(screenshot)
 
         # Compress screenshot image to make size be smaller
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.jpeg")
-        compress_screenshot(raw_screenshot_filename, screenshot_filename)
-
-        with open(screenshot_filename, "rb") as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode("utf-8")
+        img_base64 = screenshot.to_base64("JPEG", quality=85)
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -200,50 +181,13 @@ async def call_qwen_vl_with_ocr(messages, objective, model):
 
         content = json.loads(content)
 
-        processed_content = []
-
-        for operation in content:
-            if operation.get("operation") == "click":
-                text_to_click = operation.get("text")
-                if config.verbose:
-                    print(
-                        "[call_qwen_vl_with_ocr][click] text_to_click",
-                        text_to_click,
-                    )
-                # Initialize EasyOCR Reader
-                reader = easyocr.Reader(["en"])
-
-                # Read the screenshot
-                result = reader.readtext(screenshot_filename)
-
-                text_element_index = get_text_element(
-                    result, text_to_click, screenshot_filename
-                )
-                coordinates = get_text_coordinates(
-                    result, text_element_index, screenshot_filename
-                )
-
-                # add `coordinates`` to `content`
-                operation["x"] = coordinates["x"]
-                operation["y"] = coordinates["y"]
-
-                if config.verbose:
-                    print(
-                        "[call_qwen_vl_with_ocr][click] text_element_index",
-                        text_element_index,
-                    )
-                    print(
-                        "[call_qwen_vl_with_ocr][click] coordinates",
-                        coordinates,
-                    )
-                    print(
-                        "[call_qwen_vl_with_ocr][click] final operation",
-                        operation,
-                    )
-                processed_content.append(operation)
-
-            else:
-                processed_content.append(operation)
+        # Skip OCR entirely when no operation needs text coordinates, otherwise ground
+        # every targeted operation of the batch at once, with at most one extra LLM call
+        if not needs_text_grounding(content):
+            ocr_job.skip()
+        else:
+            await ground_operations(content, ocr_job, screenshot, operation_types=("click",))
+        processed_content = content
 
         # wait to append the assistant message so that if the `processed_content` step fails we don't append a message and mess up message history
         assistant_message = {"role": "assistant", "content": content_str}
@@ -268,25 +212,16 @@ def call_gemini_pro_vision(messages, objective):
         print(
             "[Self Operating Computer][call_gemini_pro_vision]",
         )
-    # sleep for a second
-    time.sleep(1)
     try:
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
-        # sleep for a second
-        time.sleep(1)
+        screenshot = capture_screenshot()
         prompt = get_system_prompt("gemini-pro-vision", objective)
 
         model = config.initialize_google()
         if config.verbose:
             print("[call_gemini_pro_vision] model", model)
 
-        response = model.generate_content([prompt, Image.open(screenshot_filename)])
+        response = model.generate_content([prompt, screenshot.image])
 
         content = response.text[1:]
         if config.verbose:
@@ -318,20 +253,14 @@ async def call_gpt_4o_with_ocr(messages, objective, model):
 
     # Construct the path to the file within the package
     try:
-        time.sleep(1)
         client = config.initialize_openai()
 
         confirm_system_prompt(messages, objective, model)
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
-
-        with open(screenshot_filename, "rb") as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode("utf-8")
+        screenshot = capture_screenshot()
+        img_base64 = screenshot.to_base64()
+        # OCR may start now to overlap the model request, it only runs if needed
+        ocr_job = create_ocr_job(screenshot)
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -365,80 +294,15 @@ async def call_gpt_4o_with_ocr(messages, objective, model):
 
         content = json.loads(content)
 
-        processed_content = []
-
-        # Initialize EasyOCR Reader once for all operations
-        reader = easyocr.Reader(["en"])
-        # Read the screenshot once
-        ocr_result = reader.readtext(screenshot_filename)
-
-        for operation in content:
-            if operation.get("operation") == "click":
-                text_to_click = operation.get("text")
-                button = operation.get("button", "left")  # Get button type, default to left
-                
-                if config.verbose:
-                    print(
-                        "[call_gpt_4o_with_ocr][click] text_to_click",
-                        text_to_click,
-                    )
-                
-                # Use LLM-assisted text element selection
-                text_element_index = get_text_element(
-                    ocr_result, text_to_click, screenshot_filename, client=client
-                )
-                
-                coordinates = get_text_coordinates(
-                    ocr_result, text_element_index, screenshot_filename
-                )
-
-                # add coordinates to operation
-                operation["x"] = coordinates["x"]
-                operation["y"] = coordinates["y"]
-                operation["button"] = button
-                
-                if config.verbose:
-                    print(
-                        "[call_gpt_4o_with_ocr][click] text_element_index",
-                        text_element_index,
-                    )
-                    print(
-                        "[call_gpt_4o_with_ocr][click] coordinates",
-                        coordinates,
-                    )
-                    print(
-                        "[call_gpt_4o_with_ocr][click] final operation",
-                        operation,
-                    )
-                processed_content.append(operation)
-
-            elif operation.get("operation") == "drag":
-                start_text = operation.get("start_text")
-                end_text = operation.get("end_text")
-                duration = operation.get("duration", 0.5)
-                
-                # Get drag and drop coordinates with LLM assistance
-                drag_drop_coords = get_drag_drop_text_coordinates(
-                    ocr_result, start_text, end_text, screenshot_filename, client=client
-                )
-                
-                # Add coordinates to operation
-                operation["start_x"] = drag_drop_coords["start_x"]
-                operation["start_y"] = drag_drop_coords["start_y"]
-                operation["end_x"] = drag_drop_coords["end_x"]
-                operation["end_y"] = drag_drop_coords["end_y"]
-                operation["duration"] = duration
-                
-                if config.verbose:
-                    print(
-                        "[call_gpt_4o_with_ocr][drag] coordinates",
-                        drag_drop_coords
-                    )
-                
-                processed_content.append(operation)
-
-            else:
-                processed_content.append(operation)
+        # Skip OCR entirely when no operation needs text coordinates, otherwise ground
+        # every targeted operation of the batch at once, with at most one extra LLM call
+        if not needs_text_grounding(content):
+            ocr_job.skip()
+        else:
+            await ground_operations(
+                content, ocr_job, screenshot, client=config.initialize_openai_async()
+            )
+        processed_content = content
 
         # wait to append the assistant message so that if the `processed_content` step fails we don't append a message and mess up message history
         assistant_message = {"role": "assistant", "content": content_str}
@@ -469,20 +333,14 @@ async def call_o1_with_ocr(messages, objective, model):
 
     # Construct the path to the file within the package
     try:
-        time.sleep(1)
         client = config.initialize_openai()
 
         confirm_system_prompt(messages, objective, model)
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
-
-        with open(screenshot_filename, "rb") as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode("utf-8")
+        screenshot = capture_screenshot()
+        img_base64 = screenshot.to_base64()
+        # OCR may start now to overlap the model request, it only runs if needed
+        ocr_job = create_ocr_job(screenshot)
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -515,50 +373,13 @@ async def call_o1_with_ocr(messages, objective, model):
 
         content = json.loads(content)
 
-        processed_content = []
-
-        for operation in content:
-            if operation.get("operation") == "click":
-                text_to_click = operation.get("text")
-                if config.verbose:
-                    print(
-                        "[call_o1_with_ocr][click] text_to_click",
-                        text_to_click,
-                    )
-                # Initialize EasyOCR Reader
-                reader = easyocr.Reader(["en"])
-
-                # Read the screenshot
-                result = reader.readtext(screenshot_filename)
-
-                text_element_index = get_text_element(
-                    result, text_to_click, screenshot_filename
-                )
-                coordinates = get_text_coordinates(
-                    result, text_element_index, screenshot_filename
-                )
-
-                # add `coordinates`` to `content`
-                operation["x"] = coordinates["x"]
-                operation["y"] = coordinates["y"]
-
-                if config.verbose:
-                    print(
-                        "[call_o1_with_ocr][click] text_element_index",
-                        text_element_index,
-                    )
-                    print(
-                        "[call_o1_with_ocr][click] coordinates",
-                        coordinates,
-                    )
-                    print(
-                        "[call_o1_with_ocr][click] final operation",
-                        operation,
-                    )
-                processed_content.append(operation)
-
-            else:
-                processed_content.append(operation)
+        # Skip OCR entirely when no operation needs text coordinates, otherwise ground
+        # every targeted operation of the batch at once, with at most one extra LLM call
+        if not needs_text_grounding(content):
+            ocr_job.skip()
+        else:
+            await ground_operations(content, ocr_job, screenshot, operation_types=("click",))
+        processed_content = content
 
         # wait to append the assistant message so that if the `processed_content` step fails we don't append a message and mess up message history
         assistant_message = {"role": "assistant", "content": content_str}
@@ -577,26 +398,20 @@ async def call_o1_with_ocr(messages, objective, model):
 
 
 async def call_gpt_4o_labeled(messages, objective, model):
-    time.sleep(1)
 
     try:
         client = config.initialize_openai()
 
         confirm_system_prompt(messages, objective, model)
-        file_path = pkg_resources.resource_filename("operate.models.weights", "best.pt")
-        yolo_model = YOLO(file_path)  # Load your trained model
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
+        # Loaded and warmed up once per process, so each step only pays for inference
+        som_detector = get_som_detector()
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
+        screenshot = capture_screenshot()
 
-        with open(screenshot_filename, "rb") as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode("utf-8")
-
-        img_base64_labeled, label_coordinates = add_labels(img_base64, yolo_model)
+        element_map = await build_element_map(screenshot, som_detector)
+        img_base64_labeled = draw_labels(
+            screenshot, element_map.boxes, element_map.label_coordinates
+        )
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -647,11 +462,14 @@ async def call_gpt_4o_labeled(messages, objective, model):
 
         processed_content = []
 
+        # Every label is resolved from the frame's element map and size, both
+        # computed once at capture time, and every operation of the batch is kept
         for operation in content:
-            print(
-                "[call_gpt_4_vision_preview_labeled] for operation in content",
-                operation,
-            )
+            if config.verbose:
+                print(
+                    "[call_gpt_4_vision_preview_labeled] for operation in content",
+                    operation,
+                )
             if operation.get("operation") == "click":
                 label = operation.get("label")
                 if config.verbose:
@@ -660,18 +478,14 @@ async def call_gpt_4o_labeled(messages, objective, model):
                         label,
                     )
 
-                coordinates = get_label_coordinates(label, label_coordinates)
+                coordinates = get_label_coordinates(label, element_map)
                 if config.verbose:
                     print(
                         "[Self Operating Computer][call_gpt_4_vision_preview_labeled] coordinates",
                         coordinates,
                     )
-                image = Image.open(
-                    io.BytesIO(base64.b64decode(img_base64))
-                )  # Load the image to get its size
-                image_size = image.size  # Get the size of the image (width, height)
                 click_position_percent = get_click_position_in_percent(
-                    coordinates, image_size
+                    coordinates, screenshot.size
                 )
                 if config.verbose:
                     print(
@@ -693,22 +507,44 @@ async def call_gpt_4o_labeled(messages, objective, model):
                         "[Self Operating Computer][call_gpt_4_vision_preview_labeled] new click operation",
                         operation,
                     )
-                processed_content.append(operation)
-            else:
+            elif operation.get("operation") == "drag":
+                drag_positions = get_drag_drop_positions(
+                    operation.get("start_label"),
+                    operation.get("end_label"),
+                    element_map,
+                    screenshot.size,
+                )
+                if not drag_positions:
+                    print(
+                        f"{ANSI_GREEN}[Self-Operating Computer]{ANSI_RED}[Error] Failed to get drag positions in percent. Trying another method {ANSI_RESET}"
+                    )
+                    return call_gpt_4o(messages)
+
+                # Same precision as the drag coordinates grounded by OCR
+                start_x, start_y, end_x, end_y = drag_positions
+                operation["start_x"] = round(start_x, 3)
+                operation["start_y"] = round(start_y, 3)
+                operation["end_x"] = round(end_x, 3)
+                operation["end_y"] = round(end_y, 3)
                 if config.verbose:
                     print(
-                        "[Self Operating Computer][call_gpt_4_vision_preview_labeled] .append none click operation",
+                        "[Self Operating Computer][call_gpt_4_vision_preview_labeled] new drag operation",
                         operation,
                     )
-
-                processed_content.append(operation)
-
-            if config.verbose:
+            elif config.verbose:
                 print(
-                    "[Self Operating Computer][call_gpt_4_vision_preview_labeled] new processed_content",
-                    processed_content,
+                    "[Self Operating Computer][call_gpt_4_vision_preview_labeled] .append none click operation",
+                    operation,
                 )
-            return processed_content
+
+            processed_content.append(operation)
+
+        if config.verbose:
+            print(
+                "[Self Operating Computer][call_gpt_4_vision_preview_labeled] new processed_content",
+                processed_content,
+            )
+        return processed_content
 
     except Exception as e:
         print(
@@ -723,16 +559,10 @@ async def call_gpt_4o_labeled(messages, objective, model):
 def call_ollama_llava(messages):
     if config.verbose:
         print("[call_ollama_llava]")
-    time.sleep(1)
     try:
         model = config.initialize_ollama()
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
         # Call the function to capture the screen with the cursor
-        capture_screen_with_cursor(screenshot_filename)
+        screenshot = capture_screenshot()
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -748,7 +578,7 @@ def call_ollama_llava(messages):
         vision_message = {
             "role": "user",
             "content": user_prompt,
-            "images": [screenshot_filename],
+            "images": [screenshot.to_base64()],
         }
         messages.append(vision_message)
 
@@ -803,47 +633,21 @@ async def call_claude_3_with_ocr(messages, objective, model):
         print("[call_claude_3_with_ocr]")
 
     try:
-        time.sleep(1)
         client = config.initialize_anthropic()
         # Initialize OpenAI client for LLM-assisted OCR
-        openai_client = config.initialize_openai()
+        openai_client = config.initialize_openai_async()
 
         confirm_system_prompt(messages, objective, model)
-        screenshots_dir = "screenshots"
-        if not os.path.exists(screenshots_dir):
-            os.makedirs(screenshots_dir)
-
-        screenshot_filename = os.path.join(screenshots_dir, "screenshot.png")
-        capture_screen_with_cursor(screenshot_filename)
+        screenshot = capture_screenshot()
+        # OCR may start now to overlap the model request, it only runs if needed
+        ocr_job = create_ocr_job(screenshot)
 
         # downsize screenshot due to 5MB size limit
-        with open(screenshot_filename, "rb") as img_file:
-            img = Image.open(img_file)
-
-            # Convert RGBA to RGB
-            if img.mode == "RGBA":
-                img = img.convert("RGB")
-
-            # Calculate the new dimensions while maintaining the aspect ratio
-            original_width, original_height = img.size
-            aspect_ratio = original_width / original_height
-            new_width = 2560  # Adjust this value to achieve the desired file size
-            new_height = int(new_width / aspect_ratio)
-            if config.verbose:
-                print("[call_claude_3_with_ocr] resizing claude")
-
-            # Resize the image
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Save the resized and converted image to a BytesIO object for JPEG format
-            img_buffer = io.BytesIO()
-            img_resized.save(
-                img_buffer, format="JPEG", quality=85
-            )  # Adjust the quality parameter as needed
-            img_buffer.seek(0)
-
-            # Encode the resized image as base64
-            img_data = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
+        if config.verbose:
+            print("[call_claude_3_with_ocr] resizing claude")
+        img_data = screenshot.to_base64(
+            "JPEG", width=2560, quality=85
+        )  # Adjust the width and quality to achieve the desired file size
 
         if len(messages) == 1:
             user_prompt = get_user_first_message_prompt()
@@ -907,77 +711,15 @@ async def call_claude_3_with_ocr(messages, objective, model):
                 f"{ANSI_GREEN}[Self-Operating Computer]{ANSI_BRIGHT_MAGENTA}[{model}] content: {content} {ANSI_RESET}"
             )
         
-        # Initialize EasyOCR Reader once for all operations
-        reader = easyocr.Reader(["en"])
-        # Read the screenshot once
-        ocr_result = reader.readtext(screenshot_filename)
-        
-        processed_content = []
-
-        for operation in content:
-            if operation.get("operation") == "click":
-                text_to_click = operation.get("text")
-                button = operation.get("button", "left")  # Get button type, default to left
-                
-                if config.verbose:
-                    print(
-                        "[call_claude_3_with_ocr][click] text_to_click",
-                        text_to_click,
-                    )
-                
-                # Use LLM-assisted text element selection
-                text_element_index = get_text_element(
-                    ocr_result, text_to_click, screenshot_filename, client=openai_client
-                )
-                
-                coordinates = get_text_coordinates(
-                    ocr_result, text_element_index, screenshot_filename
-                )
-                
-                # add coordinates to operation
-                operation["x"] = coordinates["x"]
-                operation["y"] = coordinates["y"]
-                operation["button"] = button
-                
-                if config.verbose:
-                    print(
-                        "[call_claude_3_with_ocr][click] text_element_index",
-                        text_element_index,
-                    )
-                    print(
-                        "[call_claude_3_with_ocr][click] coordinates",
-                        coordinates,
-                    )
-                
-                processed_content.append(operation)
-                    
-            elif operation.get("operation") == "drag":
-                start_text = operation.get("start_text")
-                end_text = operation.get("end_text")
-                duration = operation.get("duration", 0.5)
-                
-                # Get drag and drop coordinates with LLM assistance
-                drag_drop_coords = get_drag_drop_text_coordinates(
-                    ocr_result, start_text, end_text, screenshot_filename, client=openai_client
-                )
-                
-                # Add coordinates to operation
-                operation["start_x"] = drag_drop_coords["start_x"]
-                operation["start_y"] = drag_drop_coords["start_y"]
-                operation["end_x"] = drag_drop_coords["end_x"]
-                operation["end_y"] = drag_drop_coords["end_y"]
-                operation["duration"] = duration
-                
-                if config.verbose:
-                    print(
-                        "[call_claude_3_with_ocr][drag] coordinates",
-                        drag_drop_coords
-                    )
-                
-                processed_content.append(operation)
-
-            else:
-                processed_content.append(operation)
+        # Skip OCR entirely when no operation needs text coordinates, otherwise ground
+        # every targeted operation of the batch at once, with at most one extra LLM call
+        if not needs_text_grounding(content):
+            ocr_job.skip()
+        else:
+            await ground_operations(
+                content, ocr_job, screenshot, client=openai_client
+            )
+        processed_content = content
 
         assistant_message = {"role": "assistant", "content": content_str}
         messages.append(assistant_message)
@@ -1022,6 +764,17 @@ async def call_claude_3_with_ocr(messages, objective, model):
         return gpt_4_fallback(gpt4_messages, objective, model)
 
 
+def capture_screenshot():
+    """
+    Waits until the screen is stable and returns that frame. The frame is only
+    written to `screenshots/screenshot.png` when `config.save_screenshots` is set.
+    """
+    screenshot = wait_for_screen_settle("capture")
+    if config.save_screenshots:
+        screenshot.save(os.path.join("screenshots", "screenshot.png"))
+    return screenshot
+
+
 def get_last_assistant_message(messages):
     """
     Retrieve the last message from the assistant in the messages array.
@@ -1076,6 +829,15 @@ def confirm_system_prompt(messages, objective, model):
                 print("------------------[end message]------------------")
 
 
+def needs_text_grounding(operations):
+    """
+    Returns True if any operation has to be mapped from text to screen coordinates.
+    """
+    return any(
+        operation.get("operation") in ("click", "drag") for operation in operations
+    )
+
+
 def clean_json(content):
     if config.verbose:
         print("\n\n[clean_json] content before cleaning", content)
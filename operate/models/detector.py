@@ -0,0 +1,312 @@
+import ast
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pkg_resources
+from PIL import Image
+
+from operate.config import Config
+from operate.utils.style import ANSI_GREEN, ANSI_RED, ANSI_RESET
+
+# Load configuration
+config = Config()
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+class SomDetector:
+    """
+    Set-of-marks button detector that is loaded and warmed up once per process.
+
+    Attributes:
+        model: The underlying `ultralytics.YOLO` model.
+        stats (dict): Cold-load, warm-up and inference timings in seconds.
+    """
+
+    backend = "ultralytics"
+
+    def __init__(self, weights_path):
+        start = time.perf_counter()
+        self.model = self._load(weights_path)
+        load_seconds = time.perf_counter() - start
+
+        # The first inference pays for lazy layer fusing and allocator warm-up,
+        # so run it on a blank frame instead of on the first real screenshot
+        start = time.perf_counter()
+        self._predict(Image.new("RGB", (640, 640)), verbose=False)
+        warmup_seconds = time.perf_counter() - start
+
+        self.stats = {
+            "backend": self.backend,
+            "load_seconds": load_seconds,
+            "warmup_seconds": warmup_seconds,
+            "inferences": 0,
+            "inference_seconds": 0.0,
+            "last_inference_seconds": None,
+        }
+
+    def _load(self, weights_path):
+        # Imported here so the ONNX detector never loads torch
+        from ultralytics import YOLO
+
+        return YOLO(weights_path)
+
+    def _predict(self, image, verbose):
+        results = self.model(image, verbose=verbose)
+        boxes = []
+        for result in results:
+            if hasattr(result, "boxes"):
+                for det in result.boxes:
+                    boxes.append(tuple(det.xyxy[0].tolist()))
+        return boxes
+
+    def detect(self, image):
+        """
+        Runs the detector on a PIL image.
+
+        Returns:
+            list: Bounding boxes as `(x1, y1, x2, y2)` tuples in pixels, most
+                confident first.
+        """
+        start = time.perf_counter()
+        boxes = self._predict(image, verbose=config.verbose)
+        elapsed = time.perf_counter() - start
+
+        self.stats["inferences"] += 1
+        self.stats["inference_seconds"] += elapsed
+        self.stats["last_inference_seconds"] = elapsed
+        if config.verbose:
+            print(f"[SomDetector][detect] {self.backend} inference took {elapsed:.3f}s")
+        return boxes
+
+
+class OnnxSomDetector(SomDetector):
+    """
+    The same detector exported to ONNX and run by ONNX Runtime on CPU, without
+    torch or ultralytics.
+
+    Pre- and post-processing follow ultralytics' predictor for `.pt` models
+    (letterbox to the smallest stride multiple, confidence 0.25, class-aware
+    NMS at IoU 0.7, at most 300 boxes), so `detect` returns the same `xyxy`
+    boxes in the same order. The model must be exported with dynamic axes,
+    see `export_som_onnx`.
+
+    Args:
+        weights_path (str): Path of the `.onnx` model.
+    """
+
+    backend = "onnx"
+    CONFIDENCE = 0.25
+    IOU = 0.7
+    MAX_DETECTIONS = 300
+    MAX_NMS = 30000
+    MAX_WH = 7680  # class offset so boxes of different classes never suppress each other
+
+    def _load(self, weights_path):
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(
+            weights_path, providers=["CPUExecutionProvider"]
+        )
+        metadata = session.get_modelmeta().custom_metadata_map
+        self.stride = int(metadata.get("stride", 32))
+        imgsz = ast.literal_eval(metadata.get("imgsz", "[640, 640]"))
+        self.imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+        self.input_name = session.get_inputs()[0].name
+        return session
+
+    def _letterbox(self, pixels):
+        # Imported here so the other modes do not load OpenCV at startup
+        import cv2
+
+        height, width = pixels.shape[:2]
+        ratio = min(self.imgsz[0] / height, self.imgsz[1] / width)
+        new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+        dw = (self.imgsz[1] - new_width) % self.stride / 2
+        dh = (self.imgsz[0] - new_height) % self.stride / 2
+        if (width, height) != (new_width, new_height):
+            pixels = cv2.resize(pixels, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        return cv2.copyMakeBorder(
+            pixels, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+        )
+
+    def _predict(self, image, verbose):
+        pixels = np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+        letterboxed = self._letterbox(pixels)
+        blob = letterboxed.transpose(2, 0, 1)[None].astype(np.float32) / 255
+        output = self.model.run(None, {self.input_name: blob})[0][0]
+
+        # (4 + classes, anchors) of center x, center y, width, height and class scores
+        predictions = output.T
+        scores = predictions[:, 4:].max(axis=1)
+        keep = scores > self.CONFIDENCE
+        predictions, scores = predictions[keep], scores[keep]
+        if not len(predictions):
+            return []
+        classes = predictions[:, 4:].argmax(axis=1)
+        order = np.argsort(-scores, kind="stable")[: self.MAX_NMS]
+        predictions, scores, classes = predictions[order], scores[order], classes[order]
+
+        xy, wh = predictions[:, :2], predictions[:, 2:4]
+        boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1)
+        kept = non_max_suppression(boxes + classes[:, None] * self.MAX_WH, self.IOU)
+        boxes = boxes[kept[: self.MAX_DETECTIONS]]
+
+        # Undo the letterbox, as ultralytics' `scale_boxes` does
+        height, width = pixels.shape[:2]
+        input_height, input_width = letterboxed.shape[:2]
+        gain = min(input_height / height, input_width / width)
+        pad_x = round((input_width - width * gain) / 2 - 0.1)
+        pad_y = round((input_height - height * gain) / 2 - 0.1)
+        boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        return [tuple(box) for box in boxes.tolist()]
+
+
+def non_max_suppression(boxes, iou_threshold):
+    """
+    Greedy NMS over `(N, 4)` xyxy boxes already sorted by decreasing score.
+
+    Returns:
+        numpy.ndarray: Indices of the kept boxes, in score order.
+    """
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    remaining = np.arange(len(boxes))
+    kept = []
+    while len(remaining):
+        best, rest = remaining[0], remaining[1:]
+        kept.append(best)
+        width = (np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0])).clip(0)
+        height = (np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1])).clip(0)
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection)
+        remaining = rest[iou <= iou_threshold]
+    return np.asarray(kept, dtype=np.int64)
+
+
+def som_onnx_path(weights_path, quantize=False):
+    """
+    Returns where the ONNX export of a checkpoint is cached under `config.cache_dir`,
+    keyed by the checkpoint's content.
+    """
+    with open(weights_path, "rb") as file:
+        digest = hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+    return os.path.join(config.cache_dir, f"som-{digest}{'-int8' if quantize else ''}.onnx")
+
+
+def export_som_onnx(weights_path, quantize=False):
+    """
+    Exports a YOLO checkpoint to ONNX (dynamic input size, for `OnnxSomDetector`),
+    optionally with dynamically quantized int8 weights.
+
+    Built once, ahead of time (`operate --export-detector`): the model is cached
+    at `som_onnx_path` and reused by every later run. Exporting needs
+    ultralytics and `onnx`, loading the result does not.
+
+    Returns:
+        str: Path of the `.onnx` model.
+    """
+    onnx_path = som_onnx_path(weights_path, quantize)
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    os.makedirs(config.cache_dir, exist_ok=True)
+    # Concurrent processes may export at once, never leave a partial file
+    temporary_path = f"{onnx_path}.{os.getpid()}.tmp"
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            export_som_onnx(weights_path), temporary_path, weight_type=QuantType.QUInt8
+        )
+    else:
+        from ultralytics import YOLO
+
+        # ultralytics writes next to the checkpoint, which may be read-only when installed
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = shutil.copy(weights_path, directory)
+            exported = YOLO(checkpoint).export(format="onnx", dynamic=True, simplify=False)
+            shutil.move(exported, temporary_path)
+    os.replace(temporary_path, onnx_path)
+    if config.verbose:
+        print(f"[export_som_onnx] saved {onnx_path}")
+    return onnx_path
+
+
+def get_som_weights_path():
+    return pkg_resources.resource_filename("operate.models.weights", "best.pt")
+
+
+def create_som_detector(weights_path, backend="ultralytics", quantize=False):
+    """
+    Loads the detector on the given runtime: "ultralytics" or "onnx". The ONNX
+    model must have been exported with `export_som_onnx` beforehand.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        FileNotFoundError: If the ONNX model has not been exported.
+    """
+    if backend == "ultralytics":
+        return SomDetector(weights_path)
+    if backend == "onnx":
+        onnx_path = som_onnx_path(weights_path, quantize)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"{onnx_path} not found, build it with `operate --export-detector`"
+            )
+        return OnnxSomDetector(onnx_path)
+    raise ValueError(f"Unknown detector backend '{backend}', expected 'ultralytics' or 'onnx'")
+
+
+def get_som_detector():
+    """
+    Returns the process-wide set-of-marks detector, loading `best.pt` on first use
+    on the runtime set by `config.som_backend`.
+
+    If the ONNX detector cannot be loaded, the error is reported and ultralytics
+    is used instead.
+    """
+    global _detector
+    if _detector is not None:
+        return _detector
+
+    with _detector_lock:
+        if _detector is None:
+            weights_path = get_som_weights_path()
+            try:
+                _detector = create_som_detector(
+                    weights_path, config.som_backend, config.som_quantize
+                )
+            except Exception as e:
+                if config.som_backend != "onnx":
+                    raise
+                print(
+                    f"{ANSI_GREEN}[Self-Operating Computer]{ANSI_RED}[Error] ONNX detector "
+                    f"unavailable, using ultralytics: {e} {ANSI_RESET}"
+                )
+                _detector = SomDetector(weights_path)
+            if config.verbose:
+                print(
+                    "[get_som_detector] {backend} cold load {load_seconds:.2f}s, warm-up {warmup_seconds:.2f}s".format(
+                        **_detector.stats
+                    )
+                )
+    return _detector
+
+
+def get_detector_stats():
+    """
+    Returns the detector timings, or None if it has not been loaded yet.
+    """
+    if _detector is None:
+        return None
+    return dict(_detector.stats)
@@ -0,0 +1,197 @@
+import os
+
+import numpy as np
+
+from operate.config import Config
+
+# Load configuration
+config = Config()
+
+
+class OCRBackend:
+    """
+    Interface of an OCR engine.
+
+    `readtext` takes a numpy RGB array and returns the EasyOCR result format,
+    a list of `(box, text, confidence)` tuples where `box` holds the four
+    corners `[[x, y], ...]` clockwise from the top-left, and `confidence` is
+    between 0 and 1. Everything downstream (incremental OCR, tiling, grounding)
+    only relies on that format.
+    """
+
+    name = None
+
+    def readtext(self, image, **kwargs):
+        """
+        Recognizes the text in a numpy RGB array. `kwargs` are engine-specific
+        options, ignored by engines that have none.
+        """
+        raise NotImplementedError
+
+
+class EasyOCRBackend(OCRBackend):
+    """
+    EasyOCR detector + CRNN recognizer, the default backend.
+
+    On CPU the recognizer (its LSTM and Linear layers) can run with dynamic int8
+    quantization, see `load_quantized_recognizer`. The CRAFT detector is
+    convolutional only, which dynamic quantization does not cover, so it stays
+    in fp32.
+
+    Args:
+        languages (iterable): EasyOCR language codes, e.g. ("en",).
+        device (str): "cpu", "cuda" or "cuda:N".
+        quantize (bool, optional): Use the int8 recognizer on CPU. Defaults to
+            `config.ocr_quantize`.
+    """
+
+    name = "easyocr"
+
+    def __init__(self, languages=("en",), device="cpu", quantize=None):
+        import easyocr
+
+        if quantize is None:
+            quantize = config.ocr_quantize
+        # EasyOCR quantizes on its own on every load unless told not to; turn that
+        # off so the recognizer is fp32 unless the cached int8 mode is selected
+        self.reader = easyocr.Reader(
+            list(languages), gpu=False if device == "cpu" else device, quantize=False
+        )
+        self.quantized = bool(quantize) and device == "cpu"
+        if self.quantized:
+            self.reader.recognizer = load_quantized_recognizer(
+                self.reader.recognizer, languages
+            )
+
+    def readtext(self, image, **kwargs):
+        return self.reader.readtext(image, **kwargs)
+
+
+def quantized_recognizer_path(languages):
+    """
+    Returns where the int8 recognizer for a set of languages is cached under
+    `config.cache_dir`. The name includes the EasyOCR and torch versions, since
+    the file is a pickled module.
+    """
+    import easyocr
+    import torch
+
+    name = "-".join(sorted(languages))
+    return os.path.join(
+        config.cache_dir,
+        f"easyocr-{easyocr.__version__}-torch-{torch.__version__}-{name}-int8.pt",
+    )
+
+
+def load_quantized_recognizer(model, languages):
+    """
+    Returns the recognizer with dynamically quantized int8 LSTM and Linear layers.
+
+    The quantized module is built with `quantize_dynamic` the first time and
+    saved to `quantized_recognizer_path`. Later loads, including every tiled-OCR
+    worker, read it from there and skip the quantization.
+
+    Returns:
+        torch.nn.Module: The quantized model.
+    """
+    import torch
+
+    cache_path = quantized_recognizer_path(languages)
+    if os.path.exists(cache_path):
+        try:
+            quantized = torch.load(cache_path, map_location="cpu", weights_only=False)
+            quantized.eval()
+            return quantized
+        except Exception as e:
+            if config.verbose:
+                print(f"[load_quantized_recognizer] rebuilding {cache_path}: {e}")
+
+    quantized = torch.quantization.quantize_dynamic(
+        model, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8
+    )
+    os.makedirs(config.cache_dir, exist_ok=True)
+    # Tiled workers may build it concurrently, never leave a partial file
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    torch.save(quantized, temporary_path)
+    os.replace(temporary_path, cache_path)
+    if config.verbose:
+        print(f"[load_quantized_recognizer] saved {cache_path}")
+    return quantized
+
+
+class TesseractBackend(OCRBackend):
+    """
+    Tesseract through `pytesseract`. Needs the `tesseract` binary on the PATH.
+
+    Tesseract reports single words; the phrase assembly in `text_layout`
+    joins them back into lines for grounding.
+
+    Args:
+        languages (iterable): EasyOCR-style language codes, mapped to Tesseract's.
+    """
+
+    name = "tesseract"
+    LANGUAGE_CODES = {"en": "eng", "fr": "fra", "de": "deu", "es": "spa", "ch_sim": "chi_sim"}
+
+    def __init__(self, languages=("en",), device="cpu"):
+        import pytesseract
+
+        self.pytesseract = pytesseract
+        self.lang = "+".join(self.LANGUAGE_CODES.get(code, code) for code in languages)
+
+    def readtext(self, image, **kwargs):
+        data = self.pytesseract.image_to_data(
+            image, lang=self.lang, output_type=self.pytesseract.Output.DICT
+        )
+        result = []
+        for text, confidence, left, top, width, height in zip(
+            data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+        ):
+            confidence = float(confidence)
+            # Layout rows (pages, blocks, lines) come back with -1 and no text
+            if confidence < 0 or not text.strip():
+                continue
+            box = [[left, top], [left + width, top], [left + width, top + height], [left, top + height]]
+            result.append((box, text, confidence / 100))
+        return result
+
+
+class RapidOCRBackend(OCRBackend):
+    """
+    PaddleOCR models exported to ONNX, run by onnxruntime through `rapidocr_onnxruntime`.
+    The bundled models are Chinese/English, `languages` is not used.
+    """
+
+    name = "rapidocr"
+
+    def __init__(self, languages=("en",), device="cpu"):
+        from rapidocr_onnxruntime import RapidOCR
+
+        self.engine = RapidOCR()
+
+    def readtext(self, image, **kwargs):
+        # RapidOCR expects OpenCV's BGR channel order
+        result, _ = self.engine(np.ascontiguousarray(image[:, :, ::-1]))
+        return [
+            ([[int(x), int(y)] for x, y in box], text, float(confidence))
+            for box, text, confidence in result or []
+        ]
+
+
+BACKENDS = {
+    backend.name: backend for backend in (EasyOCRBackend, TesseractBackend, RapidOCRBackend)
+}
+
+
+def create_backend(name, languages=("en",), device="cpu", **options):
+    """
+    Instantiates an OCR backend by name. `options` go to the backend, e.g.
+    `quantize` for EasyOCR.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+        ImportError: If the backend's package is not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](languages, device, **options)
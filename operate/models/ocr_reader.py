@@ -0,0 +1,444 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from operate.config import Config
+from operate.models.ocr_backends import create_backend
+from operate.models.ocr_result import OCRResult
+from operate.models.ocr_tiles import (
+    IncrementalOCR,
+    TiledOCR,
+    offset_result,
+    sort_reading_order,
+)
+
+# Load configuration
+config = Config()
+
+# Readers are keyed by (backend, languages, device) and shared by every OCR-backed model
+_readers = {}
+_readers_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "loads": 0,
+    "load_seconds": 0.0,
+    "inferences": 0,
+    "inference_seconds": 0.0,
+    "steps_with_ocr": 0,
+    "steps_skipped": 0,
+    "steps_region_only": 0,
+    "prefetch_wasted": 0,
+    "frame_reads": 0,
+    "frame_read_seconds": 0.0,
+    "region_reads": 0,
+    "region_read_seconds": 0.0,
+}
+
+
+def _resolve_device(device):
+    """
+    Resolve the device a reader should run on. `None` picks CUDA when available.
+    """
+    if device:
+        return device
+    try:
+        import torch
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def _reader_key(languages, device, backend):
+    backend = backend or config.ocr_backend
+    # Only EasyOCR runs on torch; probing CUDA would import torch for the other backends too
+    device = _resolve_device(device) if backend == "easyocr" else device or "cpu"
+    return backend, tuple(sorted(languages)), device
+
+
+def get_ocr_reader(languages=("en",), device=None, backend=None):
+    """
+    Returns the process-wide OCR reader for the given backend, languages and
+    device, loading the model weights on first use only.
+
+    Args:
+        languages (iterable): EasyOCR language codes, e.g. ("en",).
+        device (str, optional): "cpu", "cuda" or "cuda:N". Defaults to CUDA when available
+            for EasyOCR, and to "cpu" for the other backends.
+        backend (str, optional): A name from `ocr_backends.BACKENDS`. Defaults to
+            `config.ocr_backend`.
+
+    Returns:
+        OCRBackend: A warm reader shared across the whole session.
+    """
+    key = _reader_key(languages, device, backend)
+    reader = _readers.get(key)
+    if reader is not None:
+        return reader
+
+    with _readers_lock:
+        # Another thread may have finished loading while we waited for the lock
+        reader = _readers.get(key)
+        if reader is not None:
+            return reader
+
+        backend, languages, device = key
+        start = time.perf_counter()
+        reader = create_backend(backend, languages, device)
+        elapsed = time.perf_counter() - start
+
+        with _stats_lock:
+            _stats["loads"] += 1
+            _stats["load_seconds"] += elapsed
+        if config.verbose:
+            print(
+                f"[get_ocr_reader] loaded {backend} reader {languages} on {device} in {elapsed:.2f}s"
+            )
+
+        _readers[key] = reader
+        return reader
+
+
+def read_text(image, languages=("en",), device=None, **kwargs):
+    """
+    Runs `readtext` on the shared reader and records the inference time.
+
+    Args:
+        image (numpy.ndarray): An RGB frame.
+        languages (iterable): EasyOCR language codes.
+        device (str, optional): Device the reader runs on.
+        **kwargs: Forwarded to the backend's `readtext`.
+
+    Returns:
+        list: The EasyOCR result, a list of `(box, text, confidence)` tuples.
+    """
+    reader = get_ocr_reader(languages, device)
+
+    start = time.perf_counter()
+    result = reader.readtext(image, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats["inferences"] += 1
+        _stats["inference_seconds"] += elapsed
+    if config.verbose:
+        print(f"[read_text] {len(result)} text elements in {elapsed:.2f}s")
+
+    return result
+
+
+class OCRResultCache:
+    """
+    Bounded LRU cache of OCR results keyed by the exact frame digest, so a retry
+    on an unchanged screen or a return to an earlier screen skips OCR entirely.
+    Results are `OCRResult`s and are shared, not copied.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+# Large frames are split across a process pool when more than one worker is configured,
+# started on the first large frame
+_tiled_ocr = None
+_tiled_ocr_lock = threading.Lock()
+
+
+def get_tiled_ocr():
+    """
+    Returns the tiled OCR pool, starting it and warming up every worker on first
+    use, or None if `config.ocr_workers` is below 2.
+    """
+    global _tiled_ocr
+    if config.ocr_workers <= 1:
+        return None
+    if _tiled_ocr is not None:
+        return _tiled_ocr
+
+    with _tiled_ocr_lock:
+        if _tiled_ocr is None:
+            tiled_ocr = TiledOCR(config.ocr_workers, backend=config.ocr_backend)
+            tiled_ocr.warm_up()
+            if config.verbose:
+                print(
+                    "[get_tiled_ocr] {workers} workers ready in {pool_start_seconds:.2f}s, "
+                    "loads {worker_load_seconds:.2f}s, warm-ups {worker_warmup_seconds:.2f}s "
+                    "(summed over workers)".format(workers=tiled_ocr.workers, **tiled_ocr.stats)
+                )
+            _tiled_ocr = tiled_ocr
+    return _tiled_ocr
+
+
+def recognize(pixels):
+    """
+    Runs OCR on a numpy RGB array, spreading frames of at least
+    `config.ocr_tiled_min_pixels` over the tiled process pool when enabled.
+    """
+    height, width = pixels.shape[:2]
+    if config.ocr_workers <= 1 or height * width < config.ocr_tiled_min_pixels:
+        return read_text(pixels)
+
+    tiled_ocr = get_tiled_ocr()
+    start = time.perf_counter()
+    result = tiled_ocr.read(pixels)
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats["inferences"] += 1
+        _stats["inference_seconds"] += elapsed
+    if config.verbose:
+        print(
+            f"[recognize] {len(result)} text elements in {elapsed:.2f}s "
+            f"on {tiled_ocr.workers} workers"
+        )
+    return result
+
+
+# Keeps the previous frame's tile hashes and boxes across steps
+_incremental_ocr = IncrementalOCR(recognize, tile_size=config.ocr_tile_size)
+_result_cache = OCRResultCache(config.ocr_cache_size)
+_region_cache = OCRResultCache(config.ocr_region_cache_size)
+# A single worker, the reader is not safe to run on two frames at once
+_ocr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+# Whether the last step needed a full-frame OCR pass, used to decide on prefetching.
+# Starts False: the OCR prompt lets the model point at regions, and a prefetched
+# full-frame pass would hold up the region reads of the first step
+_last_step_needed_ocr = False
+
+
+def read_screenshot(screenshot):
+    """
+    Runs OCR over a captured frame. Frames already read are served from the
+    result cache, and with `config.ocr_incremental` enabled only the tiles that
+    changed since the previous frame are recognized again.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+
+    Returns:
+        OCRResult: The EasyOCR result for the whole frame, with its box geometry
+            as arrays.
+    """
+    result = _result_cache.get(screenshot.digest)
+    if result is not None:
+        if config.verbose:
+            print("[read_screenshot] OCR cache hit")
+        return result
+
+    start = time.perf_counter()
+    if config.ocr_incremental:
+        result = _incremental_ocr.read(screenshot)
+    else:
+        result = recognize(screenshot.pixels)
+    result = OCRResult(result)
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats["frame_reads"] += 1
+        _stats["frame_read_seconds"] += elapsed
+    _result_cache.put(screenshot.digest, result)
+    return result
+
+
+def read_region(screenshot, rect):
+    """
+    Runs OCR over one rectangle of a frame only.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+        rect (tuple): `(x0, y0, x1, y1)` in pixels.
+
+    Returns:
+        OCRResult: The text found in the rectangle, in frame coordinates.
+    """
+    key = (screenshot.digest, tuple(rect))
+    result = _region_cache.get(key)
+    if result is not None:
+        return result
+
+    x0, y0, x1, y1 = rect
+    start = time.perf_counter()
+    crop = np.ascontiguousarray(screenshot.pixels[y0:y1, x0:x1])
+    result = OCRResult(sort_reading_order(offset_result(recognize(crop), x0, y0)))
+    elapsed = time.perf_counter() - start
+
+    with _stats_lock:
+        _stats["region_reads"] += 1
+        _stats["region_read_seconds"] += elapsed
+    if config.verbose:
+        print(f"[read_region] {x1 - x0}x{y1 - y0} region at ({x0}, {y0}) in {elapsed:.2f}s")
+    _region_cache.put(key, result)
+    return result
+
+
+class OCRJob:
+    """
+    OCR for one step's frame, run only if the step needs text grounding.
+
+    With prefetch the job starts in the background right away so it overlaps
+    the model request. Otherwise it starts on the first `result()` call, and a
+    step whose operations need no grounding never runs OCR at all.
+    """
+
+    def __init__(self, screenshot, prefetch):
+        self.screenshot = screenshot
+        self._future = None
+        self._used = False
+        self._done = False
+        if prefetch:
+            self._future = _ocr_executor.submit(read_screenshot, screenshot)
+
+    async def result(self, prefetch_next=True):
+        """
+        Returns the OCR result for the frame, starting OCR if it is not running yet.
+
+        Args:
+            prefetch_next (bool): Whether the "auto" prefetch should start the next
+                step's full-frame pass early. False when the pass is only used
+                because it was already under way while every target had a region hint.
+        """
+        global _last_step_needed_ocr
+        if self._future is None:
+            self._future = _ocr_executor.submit(read_screenshot, self.screenshot)
+        if not self._used:
+            self._used = True
+            _last_step_needed_ocr = prefetch_next
+            with _stats_lock:
+                _stats["steps_with_ocr"] += 1
+        return await asyncio.wrap_future(self._future)
+
+    def defer(self):
+        """
+        Holds back the full-frame pass so region reads run first, cancelling the
+        prefetch if it is still queued.
+
+        Returns:
+            bool: False if the full-frame pass is already running or done, in which
+                case it should be used rather than queueing region reads behind it.
+        """
+        if self._future is None:
+            return True
+        if self._future.cancel():
+            self._future = None
+            return True
+        return False
+
+    async def region_result(self, rect):
+        """
+        Returns the OCR result for one rectangle of the frame, or None if the
+        full-frame pass is already running or done and should be used instead.
+        """
+        if not self.defer():
+            return None
+        return await asyncio.wrap_future(
+            _ocr_executor.submit(read_region, self.screenshot, rect)
+        )
+
+    def finish_with_regions(self):
+        """
+        Marks the step as grounded by region OCR alone and cancels the full-frame
+        pass if it has not started. Unlike `skip`, the step counts as one that ran OCR.
+        """
+        global _last_step_needed_ocr
+        if self._used or self._done:
+            return
+        self._done = True
+        _last_step_needed_ocr = False
+        with _stats_lock:
+            _stats["steps_region_only"] += 1
+            if self._future is not None and not self._future.cancel():
+                _stats["prefetch_wasted"] += 1
+        if config.verbose:
+            print("[OCRJob] grounded by region OCR, full-frame OCR not needed")
+
+    def skip(self):
+        """
+        Marks the step as needing no grounding and cancels OCR if it has not started.
+        """
+        global _last_step_needed_ocr
+        if self._used or self._done:
+            return
+        self._done = True
+        _last_step_needed_ocr = False
+        with _stats_lock:
+            if self._future is None or self._future.cancel():
+                _stats["steps_skipped"] += 1
+            else:
+                _stats["prefetch_wasted"] += 1
+        if config.verbose:
+            print("[OCRJob] no grounding needed, OCR skipped")
+
+
+def create_ocr_job(screenshot):
+    """
+    Creates the OCR job for a step's frame.
+
+    `config.ocr_prefetch` decides whether OCR starts before the model answers:
+    "always", "never", or "auto" to prefetch only when the previous step needed
+    a full-frame pass, i.e. had targets its region hints could not ground.
+    """
+    if config.ocr_prefetch == "always":
+        prefetch = True
+    elif config.ocr_prefetch == "never":
+        prefetch = False
+    else:
+        prefetch = _last_step_needed_ocr
+    return OCRJob(screenshot, prefetch)
+
+
+def get_ocr_stats():
+    """
+    Returns a snapshot of the reader load and inference timing counters.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["readers"] = len(_readers)
+    stats["incremental"] = dict(_incremental_ocr.stats)
+    stats["cache"] = _result_cache.get_stats()
+    stats["region_cache"] = _region_cache.get_stats()
+    if _tiled_ocr is not None:
+        stats["tiled"] = dict(_tiled_ocr.stats)
+        # Worker readers are model loads too, one per process
+        stats["loads"] += stats["tiled"]["worker_loads"]
+        stats["load_seconds"] += stats["tiled"]["worker_load_seconds"]
+    if stats["frame_reads"]:
+        stats["frame_read_avg_seconds"] = stats["frame_read_seconds"] / stats["frame_reads"]
+    if stats["region_reads"]:
+        stats["region_read_avg_seconds"] = stats["region_read_seconds"] / stats["region_reads"]
+    if stats["inferences"]:
+        # CPU time not spent on steps that never needed OCR
+        stats["estimated_saved_seconds"] = (
+            stats["steps_skipped"] * stats["inference_seconds"] / stats["inferences"]
+        )
+    return stats
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class OCRResult(list):
+    """
+    EasyOCR output with its geometry converted to arrays once per frame.
+
+    Still a list of `(box, text, confidence)` tuples, so existing code that
+    indexes or iterates the result keeps working, plus:
+
+    - `quads`: `(N, 4, 2)` float32 corner coordinates.
+    - `xyxy`: `(N, 4)` float32 `(min_x, min_y, max_x, max_y)` bounds.
+    - `confidences`: `(N,)` float32.
+    - `texts`: the N texts.
+
+    Treat it as read-only, the arrays are not updated if the list changes.
+
+    Args:
+        result (list): The list of results returned by EasyOCR.
+    """
+
+    def __init__(self, result=()):
+        super().__init__(result)
+        if self:
+            self.quads = np.asarray([element[0] for element in self], dtype=np.float32)
+        else:
+            self.quads = np.zeros((0, 4, 2), dtype=np.float32)
+        self.xyxy = np.concatenate([self.quads.min(axis=1), self.quads.max(axis=1)], axis=1)
+        self.confidences = np.asarray([element[2] for element in self], dtype=np.float32)
+        self.texts = [element[1] for element in self]
+
+    @property
+    def centers(self):
+        """
+        `(N, 2)` box centers in pixels.
+        """
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2
+
+    @property
+    def areas(self):
+        """
+        `(N,)` box areas in pixels.
+        """
+        return (self.xyxy[:, 2] - self.xyxy[:, 0]) * (self.xyxy[:, 3] - self.xyxy[:, 1])
+
+    def percent_centers(self, size):
+        """
+        Box centers as fractions of the frame, rounded to 3 decimals like the
+        coordinates the models return.
+
+        Args:
+            size (tuple): Frame `(width, height)`.
+
+        Returns:
+            numpy.ndarray: `(N, 2)` array of `(x, y)` fractions.
+        """
+        # float64 so the rounded fractions print as 0.123 and not 0.12300000339746475
+        return np.round(self.centers.astype(np.float64) / np.asarray(size, dtype=np.float64), 3)
+
+    def percent_center(self, index, size):
+        """
+        Center of a single box as `(x, y)` fractions of the frame, rounded to 3
+        decimals. Cheaper than `percent_centers` when only one box is needed.
+        """
+        x0, y0, x1, y1 = self.xyxy[index].tolist()
+        width, height = size
+        return round((x0 + x1) / 2 / width, 3), round((y0 + y1) / 2 / height, 3)
+
+    def select(self, indices):
+        """
+        Returns a new OCRResult with only the given indices (or boolean mask).
+        """
+        indices = np.arange(len(self))[indices]
+        return self._from_arrays(
+            [self[i] for i in indices],
+            self.quads[indices],
+            self.xyxy[indices],
+            self.confidences[indices],
+        )
+
+    def concat(self, other):
+        """
+        Returns a new OCRResult with the elements of `other` after these ones,
+        reusing the arrays already computed for both.
+        """
+        return self._from_arrays(
+            list(self) + list(other),
+            np.concatenate([self.quads, other.quads]),
+            np.concatenate([self.xyxy, other.xyxy]),
+            np.concatenate([self.confidences, other.confidences]),
+        )
+
+    @classmethod
+    def _from_arrays(cls, elements, quads, xyxy, confidences):
+        result = cls.__new__(cls)
+        list.__init__(result, elements)
+        result.quads = quads
+        result.xyxy = xyxy
+        result.confidences = confidences
+        result.texts = [element[1] for element in elements]
+        return result
+
+
+def as_ocr_result(result):
+    """
+    Returns `result` itself if it already is an OCRResult, otherwise converts it.
+    """
+    return result if isinstance(result, OCRResult) else OCRResult(result)
@@ -0,0 +1,390 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from operate.config import Config
+
+# Load configuration
+config = Config()
+
+
+def box_bounds(box):
+    """
+    Returns `(min_x, min_y, max_x, max_y)` of an EasyOCR four-corner box.
+    """
+    xs = [point[0] for point in box]
+    ys = [point[1] for point in box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def offset_result(result, offset_x, offset_y):
+    """
+    Moves EasyOCR results from crop coordinates into frame coordinates.
+    """
+    return [
+        (
+            [[int(x) + offset_x, int(y) + offset_y] for x, y in box],
+            text,
+            confidence,
+        )
+        for box, text, confidence in result
+    ]
+
+
+def sort_reading_order(result):
+    """
+    Sorts results top-to-bottom then left-to-right, as a full-frame pass would.
+    """
+    return sorted(result, key=lambda element: (box_bounds(element[0])[1], box_bounds(element[0])[0]))
+
+
+def _intersects(bounds, rect):
+    return not (
+        bounds[2] < rect[0] or bounds[0] >= rect[2] or bounds[3] < rect[1] or bounds[1] >= rect[3]
+    )
+
+
+def tile_hashes(pixels, tile_size):
+    """
+    Hashes every `tile_size` square of a frame.
+
+    Returns:
+        numpy.ndarray: A `(rows, columns)` array of tile hashes.
+    """
+    height, width = pixels.shape[:2]
+    rows = -(-height // tile_size)
+    columns = -(-width // tile_size)
+    hashes = np.empty((rows, columns), dtype=np.int64)
+    for row in range(rows):
+        y = row * tile_size
+        band = pixels[y : y + tile_size]
+        for column in range(columns):
+            x = column * tile_size
+            hashes[row, column] = hash(band[:, x : x + tile_size].tobytes())
+    return hashes
+
+
+def dirty_regions(dirty, tile_size, width, height):
+    """
+    Groups dirty tiles into pixel rectangles, one per connected cluster.
+
+    Args:
+        dirty (numpy.ndarray): `(rows, columns)` boolean mask of changed tiles.
+
+    Returns:
+        list: `(x0, y0, x1, y1)` rectangles clipped to the frame.
+    """
+    seen = np.zeros_like(dirty)
+    regions = []
+    rows, columns = dirty.shape
+    for row, column in zip(*np.nonzero(dirty)):
+        if seen[row, column]:
+            continue
+        # Flood fill over 8-connected dirty tiles
+        stack = [(row, column)]
+        seen[row, column] = True
+        min_row, min_column, max_row, max_column = row, column, row, column
+        while stack:
+            r, c = stack.pop()
+            min_row, max_row = min(min_row, r), max(max_row, r)
+            min_column, max_column = min(min_column, c), max(max_column, c)
+            for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                for nc in range(max(c - 1, 0), min(c + 2, columns)):
+                    if dirty[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+        regions.append(
+            (
+                min_column * tile_size,
+                min_row * tile_size,
+                min((max_column + 1) * tile_size, width),
+                min((max_row + 1) * tile_size, height),
+            )
+        )
+    return regions
+
+
+class IncrementalOCR:
+    """
+    Re-runs OCR only on the parts of the screen that changed since the last frame.
+
+    The frame is split into tiles and each tile is hashed. Changed tiles are
+    grouped into regions, OCR runs on those crops (padded so words crossing a
+    tile edge are read whole) and the new boxes are merged with the cached
+    boxes of the unchanged area. The result keeps the EasyOCR
+    `(box, text, confidence)` format in reading order.
+
+    Args:
+        recognize (callable): Runs OCR on a numpy RGB array, e.g. `read_text`.
+        tile_size (int): Tile edge in pixels.
+        margin (int): Padding added around each changed region before OCR.
+        full_refresh_ratio (float): Above this fraction of changed tiles a
+            full-frame pass is cheaper than many crops.
+    """
+
+    def __init__(self, recognize, tile_size=128, margin=32, full_refresh_ratio=0.5):
+        self.recognize = recognize
+        self.tile_size = tile_size
+        self.margin = margin
+        self.full_refresh_ratio = full_refresh_ratio
+        self.stats = {"full_passes": 0, "incremental_passes": 0, "unchanged_frames": 0}
+        self._lock = threading.Lock()
+        self._hashes = None
+        self._result = None
+
+    def reset(self):
+        with self._lock:
+            self._hashes = None
+            self._result = None
+
+    def read(self, screenshot):
+        pixels = screenshot.pixels
+        hashes = tile_hashes(pixels, self.tile_size)
+
+        with self._lock:
+            previous_hashes, previous_result = self._hashes, self._result
+
+        if previous_hashes is None or previous_hashes.shape != hashes.shape:
+            result = self._full_pass(pixels)
+        else:
+            dirty = hashes != previous_hashes
+            if not dirty.any():
+                self.stats["unchanged_frames"] += 1
+                result = previous_result
+            elif dirty.mean() > self.full_refresh_ratio:
+                result = self._full_pass(pixels)
+            else:
+                result = self._incremental_pass(pixels, dirty, previous_result)
+
+        with self._lock:
+            self._hashes, self._result = hashes, result
+        return list(result)
+
+    def _full_pass(self, pixels):
+        self.stats["full_passes"] += 1
+        return sort_reading_order(offset_result(self.recognize(pixels), 0, 0))
+
+    def _incremental_pass(self, pixels, dirty, previous_result):
+        self.stats["incremental_passes"] += 1
+        height, width = pixels.shape[:2]
+        regions = dirty_regions(dirty, self.tile_size, width, height)
+
+        kept = []
+        stale = []
+        for element in previous_result:
+            bounds = box_bounds(element[0])
+            if any(_intersects(bounds, region) for region in regions):
+                stale.append(bounds)
+            else:
+                kept.append(element)
+
+        fresh = []
+        fresh_bounds = []
+        for region in regions:
+            # Widen the crop to cover every stale box touching this region so
+            # a word that straddles the region edge is re-read whole
+            x0, y0, x1, y1 = region
+            for bounds in stale:
+                if _intersects(bounds, region):
+                    x0, y0 = min(x0, bounds[0]), min(y0, bounds[1])
+                    x1, y1 = max(x1, bounds[2]), max(y1, bounds[3])
+            x0 = max(int(x0) - self.margin, 0)
+            y0 = max(int(y0) - self.margin, 0)
+            x1 = min(int(x1) + self.margin, width)
+            y1 = min(int(y1) + self.margin, height)
+
+            crop = np.ascontiguousarray(pixels[y0:y1, x0:x1])
+            for element in offset_result(self.recognize(crop), x0, y0):
+                bounds = box_bounds(element[0])
+                # Boxes entirely in the padding duplicate ones kept from the cache
+                if not _intersects(bounds, region):
+                    continue
+                # Long text can reach into two regions and be read by both crops
+                if any(
+                    text == element[1] and _intersects(bounds, other)
+                    for other, text in fresh_bounds
+                ):
+                    continue
+                fresh.append(element)
+                fresh_bounds.append((bounds, element[1]))
+
+        if config.verbose:
+            print(
+                f"[IncrementalOCR] {int(dirty.sum())}/{dirty.size} tiles changed, "
+                f"{len(regions)} regions, kept {len(kept)} boxes, read {len(fresh)} boxes"
+            )
+        return sort_reading_order(kept + fresh)
+
+
+def split_bands(height, bands, overlap):
+    """
+    Splits a frame into horizontal bands that overlap by `overlap` pixels.
+
+    Text lines run horizontally, so horizontal seams cut through far fewer
+    words than a grid would.
+
+    Returns:
+        list: `(y0, y1, core_y0, core_y1)` per band. The core ranges partition
+            the frame and decide which band owns a box found in an overlap.
+    """
+    bands = max(1, min(bands, height // max(overlap, 1)))
+    edges = [round(height * i / bands) for i in range(bands + 1)]
+    return [
+        (
+            max(edges[i] - overlap, 0),
+            min(edges[i + 1] + overlap, height),
+            edges[i],
+            edges[i + 1],
+        )
+        for i in range(bands)
+    ]
+
+
+def _iou(a, b):
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def merge_band_results(band_results, bands, iou_threshold=0.5):
+    """
+    Merges per-band results (already in frame coordinates) into one result.
+
+    A box is kept by the band whose core contains its center, so a word read
+    by two neighbouring bands is only kept once. Remaining near-duplicates
+    (same text, overlapping boxes) are dropped as a safety net.
+    """
+    merged = []
+    merged_bounds = []
+    for result, (_, _, core_y0, core_y1) in zip(band_results, bands):
+        for element in result:
+            bounds = box_bounds(element[0])
+            center_y = (bounds[1] + bounds[3]) / 2
+            if not core_y0 <= center_y < core_y1:
+                continue
+            if any(
+                text == element[1] and _iou(bounds, other) > iou_threshold
+                for other, text in merged_bounds
+            ):
+                continue
+            merged.append(element)
+            merged_bounds.append((bounds, element[1]))
+    return sort_reading_order(merged)
+
+
+# Reader owned by each worker process of the tiled OCR pool
+_worker_reader = None
+
+
+def _init_worker(backend, languages, threads, load_times):
+    global _worker_reader
+    from operate.models.ocr_backends import create_backend
+
+    # Split the cores between workers instead of letting each one claim all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if backend == "easyocr":
+        import torch
+
+        torch.set_num_threads(threads)
+    start = time.perf_counter()
+    _worker_reader = create_backend(backend, languages)
+    load_seconds = time.perf_counter() - start
+
+    # The first inference pays for allocator and kernel warm-up, do it before any real band
+    start = time.perf_counter()
+    _worker_reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8))
+    load_times.put((os.getpid(), load_seconds, time.perf_counter() - start))
+
+
+def _noop():
+    return os.getpid()
+
+
+def _recognize_band(pixels):
+    return _worker_reader.readtext(pixels)
+
+
+class TiledOCR:
+    """
+    Recognizes large frames by splitting them into overlapping horizontal bands
+    and reading the bands in parallel on a pool of processes, one OCR reader
+    per process.
+
+    Every worker loads its reader and runs a warm-up inference when it starts;
+    `warm_up()` starts all of them and waits for that, recording the times in
+    `stats`.
+
+    Args:
+        workers (int): Number of worker processes.
+        backend (str): A name from `ocr_backends.BACKENDS`.
+        languages (iterable): EasyOCR language codes.
+        overlap (int): Pixels shared by neighbouring bands, at least the height
+            of the tallest text line expected.
+    """
+
+    def __init__(self, workers, backend="easyocr", languages=("en",), overlap=64):
+        self.workers = workers
+        self.overlap = overlap
+        self.stats = {
+            "passes": 0,
+            "worker_loads": 0,
+            "worker_load_seconds": 0.0,
+            "worker_warmup_seconds": 0.0,
+            "pool_start_seconds": None,
+        }
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        # torch does not survive a fork once its thread pools exist
+        context = multiprocessing.get_context("spawn")
+        self._load_times = context.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(backend, tuple(languages), threads, self._load_times),
+        )
+
+    def warm_up(self, timeout=600):
+        """
+        Starts every worker and waits until each one has loaded its reader and
+        run its warm-up inference.
+        """
+        start = time.perf_counter()
+        # Workers are spawned on demand, one per task submitted while none is idle
+        for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+            future.result(timeout=timeout)
+        self._collect_load_times(block=True, timeout=timeout)
+        self.stats["pool_start_seconds"] = time.perf_counter() - start
+
+    def _collect_load_times(self, block=False, timeout=None):
+        while self.stats["worker_loads"] < self.workers:
+            try:
+                _, load_seconds, warmup_seconds = self._load_times.get(block, timeout)
+            except queue.Empty:
+                return
+            self.stats["worker_loads"] += 1
+            self.stats["worker_load_seconds"] += load_seconds
+            self.stats["worker_warmup_seconds"] += warmup_seconds
+
+    def read(self, pixels):
+        height = pixels.shape[0]
+        bands = split_bands(height, self.workers, self.overlap)
+        crops = [np.ascontiguousarray(pixels[y0:y1]) for y0, y1, _, _ in bands]
+        band_results = [
+            offset_result(result, 0, y0)
+            for result, (y0, _, _, _) in zip(self._pool.map(_recognize_band, crops), bands)
+        ]
+        self.stats["passes"] += 1
+        self._collect_load_times()
+        return merge_band_results(band_results, bands)
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
@@ -179,7 +179,7 @@ You have 6 possible operation actions available to you. The `pyautogui` library
 
 1. click - Move mouse and click - Look for text to click. Try to find relevant text to click, but if there's nothing relevant enough you can return `"nothing to click"` for the text value and we'll try a different method.
 '''
-[{{ "thought": "write a thought here", "operation": "click", "text": "The text in the button or link to click" }}]  
+[{{ "thought": "write a thought here", "operation": "click", "text": "The text in the button or link to click", "region": {{ "x": "x percent as a decimal, optional", "y": "y percent as a decimal, optional" }} }}]  
 '''
 2. click - Right click on text
 '''
@@ -187,7 +187,7 @@ You have 6 possible operation actions available to you. The `pyautogui` library
 '''
 3. drag - Drag and drop from one text element to another
 '''
-[{{ "thought": "write a thought here", "operation": "drag", "start_text": "text at starting point", "end_text": "text at ending point", "duration": "duration in seconds (optional)" }}]
+[{{ "thought": "write a thought here", "operation": "drag", "start_text": "text at starting point", "end_text": "text at ending point", "start_region": {{ "x": "x percent as a decimal, optional", "y": "y percent as a decimal, optional" }}, "end_region": {{ "x": "...", "y": "..." }}, "duration": "duration in seconds (optional)" }}]
 '''
 4. write - Write with your keyboard
 '''
@@ -222,7 +222,7 @@ Example 2: Open a new Google Docs when the browser is already open
 Example 3: Search for someone on Linkedin when already on linkedin.com
 '''
 [
-    {{ "thought": "I can see the search field with the placeholder text 'search'. I click that field to search", "operation": "click", "text": "search" }},
+    {{ "thought": "I can see the search field with the placeholder text 'search'. I click that field to search", "operation": "click", "text": "search", "region": {{ "x": "0.35", "y": "0.05" }} }},
 ]
 '''
 
@@ -244,6 +244,7 @@ A few important notes:
 
 - Default to Google Chrome as the browser
 - Go to websites by opening a new tab with `press` and then `write` the URL
+- `region`, `start_region` and `end_region` are optional: where on the screen the text roughly is, as fractions of the screen width (x, from the left) and height (y, from the top). A rough guess is fine, the text is searched for around it. Leave them out if you are unsure.
 - Reflect on previous actions and the screenshot to ensure they align and that your previous actions worked. 
 - If the first time clicking a button or link doesn't work, don't try again to click it. Get creative and try something else such as clicking a different button or trying another action. 
 - Don't respond saying you're unable to assist with requests. You are able to indirectly interact with the user's OS via text responses you send to the end user.
@@ -1,6 +1,5 @@
 import sys
 import os
-import time
 import asyncio
 from prompt_toolkit.shortcuts import message_dialog
 from prompt_toolkit import prompt
@@ -24,6 +23,11 @@ from operate.utils.style import (
 )
 from operate.utils.operating_system import OperatingSystem
 from operate.models.apis import get_next_action
+from operate.models.detector import get_detector_stats
+from operate.models.ocr_reader import get_ocr_stats
+from operate.utils.match_ranking import record_action_point
+from operate.utils.ocr import get_match_stats
+from operate.utils.settle import get_settle_stats, wait_for_screen_settle
 
 # Load configuration
 config = Config()
@@ -130,6 +134,12 @@ def main(model, terminal_prompt, voice_mode=False, verbose_mode=False):
             )
             break
 
+    if config.verbose:
+        print("[Self Operating Computer] ocr stats", get_ocr_stats())
+        print("[Self Operating Computer] text match stats", get_match_stats())
+        print("[Self Operating Computer] detector stats", get_detector_stats())
+        print("[Self Operating Computer] settle stats", get_settle_stats())
+
 
 def operate(operations, model):
     if config.verbose:
@@ -137,8 +147,6 @@ def operate(operations, model):
     for operation in operations:
         if config.verbose:
             print("[Self Operating Computer][operate] operation", operation)
-        # wait one second
-        time.sleep(1)
         operate_type = operation.get("operation").lower()
         operate_thought = operation.get("thought")
         operate_detail = ""
@@ -161,6 +169,7 @@ def operate(operations, model):
             operate_detail = click_detail
 
             operating_system.mouse(click_detail)
+            record_action_point(x, y)
         elif operate_type == "drag":
             start_x = operation.get("start_x")
             start_y = operation.get("start_y")
@@ -177,6 +186,7 @@ def operate(operations, model):
             }
             
             operating_system.drag_and_drop(start_x, start_y, end_x, end_y, duration)
+            record_action_point(end_x, end_y)
         elif operate_type == "done":
             summary = operation.get("summary")
 
@@ -201,4 +211,7 @@ def operate(operations, model):
         print(f"{operate_thought}")
         print(f"{ANSI_BLUE}Action: {ANSI_RESET}{operate_type} {operate_detail}\n")
 
+        # Let the UI react before the next operation or the next screenshot
+        wait_for_screen_settle(operate_type)
+
     return False
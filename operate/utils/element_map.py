@@ -0,0 +1,173 @@
+import asyncio
+
+import numpy as np
+
+from operate.config import Config
+from operate.utils.label import label_boxes
+from operate.utils.text_index import get_text_index
+
+# Load configuration
+config = Config()
+
+
+class ElementMap:
+    """
+    Everything located on one frame: the set-of-marks controls found by the
+    detector, the OCR text, and which text sits on which control.
+
+    Controls carry the same labels `draw_labels` draws. Each OCR element (boxes
+    and assembled phrases of the text index) is joined to the smallest control
+    containing its center, if any. All lookups are answered from arrays
+    computed once here, so the label, text and drag helpers share one map per
+    frame without running the detector or OCR again.
+
+    For label lookups the map behaves like the `label_coordinates` dict:
+    `get_label_coordinates` and `get_drag_drop_positions` accept it as is.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+        boxes (list): The detector's `(x1, y1, x2, y2)` boxes, most confident first.
+        result (OCRResult, optional): The OCR result for the frame.
+
+    Attributes:
+        boxes (list): Every detection, labeled or not.
+        label_coordinates (dict): Labels ("~0", "~1", ...) mapped to their boxes.
+        result (OCRResult): The OCR result, or None when the map has no text.
+        text_index (OCRTextIndex): The shared index of `result`, or None.
+    """
+
+    def __init__(self, screenshot, boxes, result=None):
+        self.screenshot = screenshot
+        self.boxes = boxes
+        self.label_coordinates = label_boxes(boxes)
+        self.labels = list(self.label_coordinates)
+        self.controls = np.asarray(
+            list(self.label_coordinates.values()), dtype=np.float64
+        ).reshape(-1, 4)
+        self.areas = (self.controls[:, 2] - self.controls[:, 0]) * (
+            self.controls[:, 3] - self.controls[:, 1]
+        )
+
+        self.result = result
+        self.text_index = None
+        # Position in `labels` of the control each text index element sits on, or -1
+        self.text_controls = np.zeros(0, dtype=np.int64)
+        self.control_texts = {}
+        if result is not None:
+            self.text_index = get_text_index(result)
+            self.text_controls = self._containing(self.text_index.elements.centers)
+            words = {}
+            # Only the OCR boxes, the assembled phrases would repeat their words
+            for index in range(self.text_index.size):
+                position = self.text_controls[index]
+                if position >= 0:
+                    words.setdefault(self.labels[position], []).append(self.text_index.texts[index])
+            self.control_texts = {label: " ".join(texts) for label, texts in words.items()}
+
+    def _containing(self, points):
+        """
+        For each `(x, y)` pixel point, the position of the smallest control
+        containing it, or -1.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(self.controls):
+            return np.full(len(points), -1, dtype=np.int64)
+        inside = (
+            (points[:, None, 0] >= self.controls[None, :, 0])
+            & (points[:, None, 0] <= self.controls[None, :, 2])
+            & (points[:, None, 1] >= self.controls[None, :, 1])
+            & (points[:, None, 1] <= self.controls[None, :, 3])
+        )
+        areas = np.where(inside, self.areas[None, :], np.inf)
+        positions = areas.argmin(axis=1)
+        return np.where(inside.any(axis=1), positions, -1)
+
+    def get(self, label, default=None):
+        return self.label_coordinates.get(label, default)
+
+    def __contains__(self, label):
+        return label in self.label_coordinates
+
+    def __getitem__(self, label):
+        return self.label_coordinates[label]
+
+    def __len__(self):
+        return len(self.label_coordinates)
+
+    def text_of(self, label):
+        """
+        Returns the OCR text on a control, in reading order, or "" if it has none.
+        """
+        return self.control_texts.get(label, "")
+
+    def label_of_text(self, index):
+        """
+        Returns the label of the control a text index element sits on, or None.
+        """
+        if index >= len(self.text_controls) or self.text_controls[index] < 0:
+            return None
+        return self.labels[self.text_controls[index]]
+
+    def find_text(self, search_text):
+        """
+        Every text index element containing the search text exactly, boxes
+        first then assembled phrases, with the control each one sits on.
+
+        Returns:
+            list: `(index, label)` pairs, `label` being None for text that is
+                not on a detected control.
+        """
+        if self.text_index is None:
+            return []
+        return [
+            (index, self.label_of_text(index)) for index in self.text_index.find(search_text)
+        ]
+
+    def at_point(self, x, y):
+        """
+        Returns the label of the smallest control under a point, or None.
+
+        Args:
+            x (float): Horizontal position as a fraction of the screen.
+            y (float): Vertical position as a fraction of the screen.
+        """
+        width, height = self.screenshot.size
+        position = self._containing((x * width, y * height))[0]
+        return self.labels[position] if position >= 0 else None
+
+
+async def build_element_map(screenshot, detector=None, ocr_job=None, prefetch_next=True):
+    """
+    Builds the element map of a frame, running the detector and OCR concurrently.
+
+    The detector runs in a worker thread while the OCR job (prefetched or
+    started here) runs on the OCR executor.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+        detector (optional): Object detector whose `detect` returns `(x1, y1, x2, y2)`
+            boxes. Without it the map only holds the OCR text.
+        ocr_job (OCRJob, optional): The OCR job for the frame. Without it the
+            map only holds the detected controls.
+        prefetch_next (bool): Forwarded to `OCRJob.result`.
+
+    Returns:
+        ElementMap: The element map.
+    """
+    loop = asyncio.get_running_loop()
+    pending = []
+    if detector is not None:
+        pending.append(loop.run_in_executor(None, detector.detect, screenshot.image))
+    if ocr_job is not None:
+        pending.append(ocr_job.result(prefetch_next=prefetch_next))
+    found = await asyncio.gather(*pending)
+
+    boxes = found.pop(0) if detector is not None else []
+    result = found.pop(0) if ocr_job is not None else None
+    element_map = ElementMap(screenshot, boxes, result)
+    if config.verbose:
+        print(
+            f"[build_element_map] {len(element_map)} controls, "
+            f"{len(element_map.control_texts)} with text"
+        )
+    return element_map
@@ -1,10 +1,15 @@
 import io
 import base64
-import json
+import math
 import os
+import threading
 import time
-import asyncio
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
+
+from operate.config import Config
+
+# Load configuration
+config = Config()
 
 
 def validate_and_extract_image_data(data):
@@ -31,7 +36,7 @@ def get_label_coordinates(label, label_coordinates):
     Retrieves the coordinates for a given label.
 
     :param label: The label to find coordinates for (e.g., "~1").
-    :param label_coordinates: Dictionary containing labels and their coordinates.
+    :param label_coordinates: Dictionary (or `ElementMap`) containing labels and their coordinates.
     :return: Coordinates of the label or None if the label is not found.
     """
     return label_coordinates.get(label)
@@ -52,92 +57,159 @@ def is_overlapping(box1, box2):
     return True
 
 
-def add_labels(base64_data, yolo_model):
-    image_bytes = base64.b64decode(base64_data)
-    image_labeled = Image.open(io.BytesIO(image_bytes))  # Corrected this line
-    image_debug = image_labeled.copy()  # Create a copy for the debug image
-    image_original = (
-        image_labeled.copy()
-    )  # Copy of the original image for base64 return
+class BoxGrid:
+    """
+    Uniform grid over accepted boxes, so checking a new box against them only
+    looks at the boxes sharing a grid cell with it instead of all of them.
 
-    results = yolo_model(image_labeled)
+    A box is stored in every cell it touches, edges included, so two boxes
+    that `is_overlapping` considers overlapping (touching edges count) always
+    share a cell.
 
-    draw = ImageDraw.Draw(image_labeled)
-    debug_draw = ImageDraw.Draw(
-        image_debug
-    )  # Create a separate draw object for the debug image
-    font_size = 45
+    Args:
+        cell_size (float): Width and height of a grid cell in pixels.
+    """
 
-    labeled_images_dir = "labeled_images"
-    label_coordinates = {}  # Dictionary to store coordinates
-
-    if not os.path.exists(labeled_images_dir):
-        os.makedirs(labeled_images_dir)
-
-    counter = 0
-    drawn_boxes = []  # List to keep track of boxes already drawn
-    for result in results:
-        if hasattr(result, "boxes"):
-            for det in result.boxes:
-                bbox = det.xyxy[0]
-                x1, y1, x2, y2 = bbox.tolist()
-
-                debug_label = "D_" + str(counter)
-                debug_index_position = (x1, y1 - font_size)
-                debug_draw.rectangle([(x1, y1), (x2, y2)], outline="blue", width=1)
-                debug_draw.text(
-                    debug_index_position,
-                    debug_label,
-                    fill="blue",
-                    font_size=font_size,
-                )
-
-                overlap = any(
-                    is_overlapping((x1, y1, x2, y2), box) for box in drawn_boxes
-                )
-
-                if not overlap:
-                    draw.rectangle([(x1, y1), (x2, y2)], outline="red", width=1)
-                    label = "~" + str(counter)
-                    index_position = (x1, y1 - font_size)
-                    draw.text(
-                        index_position,
-                        label,
-                        fill="red",
-                        font_size=font_size,
-                    )
-
-                    # Add the non-overlapping box to the drawn_boxes list
-                    drawn_boxes.append((x1, y1, x2, y2))
-                    label_coordinates[label] = (x1, y1, x2, y2)
-
-                    counter += 1
-
-    # Save the image
-    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    def __init__(self, cell_size):
+        self.cell_size = max(float(cell_size), 1.0)
+        self.cells = {}
+        self.boxes = []
+
+    def _cells(self, box):
+        x1, y1, x2, y2 = box
+        size = self.cell_size
+        for column in range(math.floor(x1 / size), math.floor(x2 / size) + 1):
+            for row in range(math.floor(y1 / size), math.floor(y2 / size) + 1):
+                yield column, row
+
+    def overlaps(self, box):
+        """
+        True if `box` overlaps any box added so far.
+        """
+        checked = set()
+        for cell in self._cells(box):
+            for index in self.cells.get(cell, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                if is_overlapping(box, self.boxes[index]):
+                    return True
+        return False
+
+    def add(self, box):
+        index = len(self.boxes)
+        self.boxes.append(box)
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(index)
 
-    output_path = os.path.join(labeled_images_dir, f"img_{timestamp}_labeled.png")
-    output_path_debug = os.path.join(labeled_images_dir, f"img_{timestamp}_debug.png")
-    output_path_original = os.path.join(
-        labeled_images_dir, f"img_{timestamp}_original.png"
-    )
 
-    image_labeled.save(output_path)
-    image_debug.save(output_path_debug)
-    image_original.save(output_path_original)
+def select_non_overlapping(boxes):
+    """
+    Keeps each box that does not overlap a box kept before it, in order.
+
+    Same result as checking every box against all the kept ones, in roughly
+    linear time for screen-sized detections.
+
+    Returns:
+        list: The kept boxes.
+    """
+    if not boxes:
+        return []
+    # Cells about the size of a typical element keep both the number of cells
+    # per box and the number of boxes per cell small
+    sizes = sorted(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in boxes)
+    grid = BoxGrid(sizes[len(sizes) // 2])
+    kept = []
+    for box in boxes:
+        if not grid.overlaps(box):
+            grid.add(box)
+            kept.append(box)
+    return kept
+
+
+def label_boxes(boxes):
+    """
+    Numbers the detections that do not overlap a detection kept before them.
+
+    Returns:
+        dict: Labels ("~0", "~1", ...) mapped to their `(x1, y1, x2, y2)` boxes,
+            in detection order.
+    """
+    return {
+        "~" + str(counter): tuple(box)
+        for counter, box in enumerate(select_non_overlapping(boxes))
+    }
 
-    buffered_original = io.BytesIO()
-    image_original.save(buffered_original, format="PNG")  # I guess this is needed
-    img_base64_original = base64.b64encode(buffered_original.getvalue()).decode("utf-8")
 
-    # Convert image to base64 for return
+def draw_labels(screenshot, boxes, label_coordinates, font_size=45):
+    """
+    Draws the labeled boxes on a copy of the frame.
+
+    With `config.save_label_artifacts` set, the labeled, debug and original
+    images are written to `labeled_images/` in a background thread.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+        boxes (list): Every detection, for the debug overlay.
+        label_coordinates (dict): The labeled boxes, see `label_boxes`.
+
+    Returns:
+        str: The labeled image as a base64 PNG.
+    """
+    image_labeled = screenshot.image.copy()  # Draw on a copy of the shared frame
+    draw = ImageDraw.Draw(image_labeled)
+    for label, (x1, y1, x2, y2) in label_coordinates.items():
+        draw.rectangle([(x1, y1), (x2, y2)], outline="red", width=1)
+        index_position = (x1, y1 - font_size)
+        draw.text(
+            index_position,
+            label,
+            fill="red",
+            font_size=font_size,
+        )
+
     buffered_labeled = io.BytesIO()
-    image_labeled.save(buffered_labeled, format="PNG")  # I guess this is needed
-    with open("labeled_image.png", "wb") as f:
-        f.write(buffered_labeled.getvalue())
+    image_labeled.save(buffered_labeled, format="PNG")
     img_base64_labeled = base64.b64encode(buffered_labeled.getvalue()).decode("utf-8")
 
-    return img_base64_labeled, label_coordinates
+    if config.save_label_artifacts:
+        threading.Thread(
+            target=save_label_artifacts,
+            args=(screenshot.image, image_labeled, boxes, font_size),
+        ).start()
+
+    return img_base64_labeled
+
+
+def save_label_artifacts(image_original, image_labeled, boxes, font_size=45):
+    """
+    Writes the labeled image, a debug overlay of every detection (labeled or
+    not) and the original frame to `labeled_images/`.
+
+    Neither image is modified, so this is safe to run in a background thread
+    while the agent keeps using them.
+    """
+    labeled_images_dir = "labeled_images"
+    os.makedirs(labeled_images_dir, exist_ok=True)
+
+    image_debug = image_original.copy()
+    debug_draw = ImageDraw.Draw(image_debug)
+    for counter, (x1, y1, x2, y2) in enumerate(boxes):
+        debug_draw.rectangle([(x1, y1), (x2, y2)], outline="blue", width=1)
+        debug_draw.text(
+            (x1, y1 - font_size),
+            "D_" + str(counter),
+            fill="blue",
+            font_size=font_size,
+        )
+
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    prefix = os.path.join(labeled_images_dir, f"img_{timestamp}")
+    image_labeled.save(f"{prefix}_labeled.png")
+    image_debug.save(f"{prefix}_debug.png")
+    image_original.save(f"{prefix}_original.png")
+    if config.verbose:
+        print(f"[save_label_artifacts] saved {prefix}_*.png")
 
 
 def get_click_position_in_percent(coordinates, image_size):
@@ -169,7 +241,7 @@ def get_drag_drop_positions(start_label, end_label, label_coordinates, image_siz
     Args:
         start_label (str): The label ID for the starting element.
         end_label (str): The label ID for the ending element.
-        label_coordinates (dict): Dictionary mapping label IDs to their coordinates.
+        label_coordinates (dict): Dictionary (or `ElementMap`) mapping label IDs to their coordinates.
         image_size (tuple): A tuple of the image dimensions (width, height).
         
     Returns:
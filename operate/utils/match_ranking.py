@@ -0,0 +1,118 @@
+import numpy as np
+import pyautogui
+
+from operate.config import Config
+from operate.utils.text_index import normalize_text
+
+# Load configuration
+config = Config()
+
+# Where the last click or drop landed, as fractions of the screen
+_last_action_point = None
+
+# Relative weight of each signal in a candidate's score
+WEIGHTS = {
+    "match": 0.4,
+    "confidence": 0.2,
+    "last_action": 0.2,
+    "pointer": 0.1,
+    "size": 0.1,
+    "control": 0.1,
+}
+
+
+def record_action_point(x, y):
+    """
+    Remembers where the last click or drop happened, as fractions of the screen.
+    """
+    global _last_action_point
+    try:
+        _last_action_point = (float(x), float(y))
+    except (TypeError, ValueError):
+        _last_action_point = None
+
+
+def get_pointer_point():
+    """
+    Returns the mouse position as fractions of the screen, or None if unavailable.
+    """
+    try:
+        x, y = pyautogui.position()
+        width, height = pyautogui.size()
+        return x / width, y / height
+    except Exception:
+        return None
+
+
+def _proximity(point, centers):
+    if point is None:
+        return np.zeros(len(centers))
+    # Distances are fractions of the screen, so 0.25 is about a quarter of the way across
+    distances = np.hypot(centers[:, 0] - point[0], centers[:, 1] - point[1])
+    return np.exp(-distances / 0.25)
+
+
+def rank_candidates(text_index, indices, search_text, screenshot, element_map=None):
+    """
+    Scores duplicate matches for the same text so the right one can be picked
+    without a model call.
+
+    Signals: exact versus partial match, OCR confidence, closeness to the
+    previous action and to the mouse pointer (people and agents tend to work
+    near where they just were), box size relative to the other candidates,
+    and whether the text sits on a control the set-of-marks detector found.
+
+    Args:
+        text_index (OCRTextIndex): The index the candidates come from.
+        indices (list): Candidate indices into the text index.
+        search_text (str): The text being looked for.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+        element_map (ElementMap, optional): The frame's element map, built on
+            the same OCR result.
+
+    Returns:
+        list: `(index, score)` pairs, best first, higher is better.
+    """
+    query = normalize_text(search_text)
+    candidates = text_index.elements.select(list(indices))
+    centers = candidates.percent_centers(screenshot.size)
+    areas = candidates.areas
+
+    texts = [normalize_text(text) for text in candidates.texts]
+    signals = {
+        # A label that is exactly the target beats a longer line that merely contains it
+        "match": np.array(
+            [1.0 if text == query else len(query) / max(len(text), 1) for text in texts]
+        ),
+        "confidence": candidates.confidences,
+        "last_action": _proximity(_last_action_point, centers),
+        "pointer": _proximity(get_pointer_point(), centers),
+        "size": areas / (areas.max() or 1),
+        # Text on a detected button or field is more likely the target than a caption
+        "control": np.array(
+            [
+                float(element_map is not None and element_map.label_of_text(index) is not None)
+                for index in indices
+            ]
+        ),
+    }
+    scores = sum(WEIGHTS[name] * values for name, values in signals.items())
+
+    ranked = [(index, float(score)) for index, score in zip(indices, scores)]
+    if config.verbose:
+        for position, (index, score) in enumerate(ranked):
+            print(
+                f"[rank_candidates] index {index} '{text_index.texts[index]}' score {score:.3f}",
+                {name: round(float(values[position]), 3) for name, values in signals.items()},
+            )
+    return sorted(ranked, key=lambda pair: (-pair[1], pair[0]))
+
+
+def is_decisive(ranked, margin=None):
+    """
+    True when the best candidate leads the runner-up by at least `margin`
+    (defaults to `config.ocr_rank_margin`), i.e. no model tiebreak is needed.
+    """
+    if margin is None:
+        margin = config.ocr_rank_margin
+    return len(ranked) < 2 or ranked[0][1] - ranked[1][1] >= margin
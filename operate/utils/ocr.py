@@ -1,286 +1,382 @@
 from operate.config import Config
+from operate.models.detector import get_som_detector
+from operate.utils.element_map import build_element_map
+from operate.utils.match_ranking import is_decisive, rank_candidates
+from operate.models.ocr_result import as_ocr_result
+from operate.utils.text_index import get_text_index
 from PIL import Image, ImageDraw, ImageFont
-import os
+import asyncio
 import base64
 import io
-from datetime import datetime
-import time
+import json
+import random
+from functools import lru_cache
 
 # Load configuration
 config = Config()
 
+# Most candidate boxes cropped into one disambiguation image
+MAX_CANDIDATE_CROPS = 8
+# Annotated rendering of the most recent frame: (digest, result, image)
+_annotated_cache = (None, None, None)
+# How each text lookup was resolved
+_match_stats = {
+    "exact": 0,
+    "phrase": 0,
+    "local": 0,
+    "llm": 0,
+    "not_found": 0,
+    "ranked": 0,
+    "tiebreak": 0,
+    "llm_calls": 0,
+    "deadline_exceeded": 0,
+    "region": 0,
+    "control": 0,
+}
 
-def create_annotated_ocr_image(result, image_path, search_text=None, start_text=None, end_text=None):
+
+def find_local_match(result, search_text):
+    """
+    Finds the best approximate match for the search text without calling a model.
+
+    Returns:
+        int or None: The index of the best match (possibly an assembled phrase),
+            or None if no candidate scores at least `config.ocr_match_threshold`.
+    """
+    text_index = get_text_index(result)
+    ranked = text_index.search(search_text)
+    if not ranked or ranked[0][1] < config.ocr_match_threshold:
+        if config.verbose and ranked:
+            print(
+                f"[find_local_match] best local candidate for '{search_text}' "
+                f"scored {ranked[0][1]:.2f}: '{text_index.texts[ranked[0][0]]}'"
+            )
+        return None
+    index, score = ranked[0]
+    if config.verbose:
+        print(
+            f"[find_local_match] '{search_text}' matched '{text_index.texts[index]}' "
+            f"at index {index} locally (score {score:.2f})"
+        )
+    return index
+
+
+def get_match_stats():
+    """
+    Returns how text lookups were resolved and how often the model call was avoided.
+    """
+    stats = dict(_match_stats)
+    approximate = stats["local"] + stats["llm"]
+    stats["llm_avoided_ratio"] = stats["local"] / approximate if approximate else None
+    duplicates = stats["ranked"] + stats["tiebreak"]
+    stats["tiebreak_avoided_ratio"] = stats["ranked"] / duplicates if duplicates else None
+    return stats
+
+
+@lru_cache(maxsize=None)
+def get_annotation_font(size=20):
+    """
+    Loads the font used for OCR annotations once per process.
+    """
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        try:
+            return ImageFont.truetype("DejaVuSans.ttf", size)
+        except OSError:
+            return ImageFont.load_default()
+
+
+def create_annotated_ocr_image(result, screenshot):
     """
     Creates an image with all OCR detected text elements annotated with indices.
-    
+    The rendering is cached per frame, so several lookups on one step draw it once.
+
     Args:
-        result (list): The list of results returned by EasyOCR.
-        image_path (str): Path to the original image.
-        search_text (str, optional): Text being searched for in a click operation.
-        start_text (str, optional): Starting text for drag operation.
-        end_text (str, optional): Ending text for drag operation.
-        
+        result (OCRResult): The OCR result for the frame.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+
     Returns:
-        tuple: (annotated_image_path, base64_encoded_image)
+        PIL.Image.Image: The annotated frame. Shared, copy it before drawing on it.
     """
-    # Create /ocr directory if it doesn't exist
-    ocr_dir = "ocr"
-    if not os.path.exists(ocr_dir):
-        os.makedirs(ocr_dir)
+    global _annotated_cache
+    digest, cached_result, image = _annotated_cache
+    if digest == screenshot.digest and cached_result is result:
+        return image
 
-    # Open the original image
-    image = Image.open(image_path)
+    # Draw on a copy so the shared frame stays untouched
+    image = screenshot.image.copy()
     draw = ImageDraw.Draw(image)
-    
-    # Try to use a default font
-    try:
-        font = ImageFont.truetype("arial.ttf", 20)
-    except:
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", 20)
-        except:
-            font = ImageFont.load_default()
-    
+    font = get_annotation_font()
+
     # Draw all text elements with their indices
-    for index, element in enumerate(result):
-        text = element[1]
-        box = element[0]
-        
-        # Calculate bounding box
-        min_x = min([coord[0] for coord in box])
-        max_x = max([coord[0] for coord in box])
-        min_y = min([coord[1] for coord in box])
-        max_y = max([coord[1] for coord in box])
-        
+    source, result = result, as_ocr_result(result)
+    for index, (text, (min_x, min_y, max_x, max_y)) in enumerate(
+        zip(result.texts, result.xyxy.tolist())
+    ):
         # Draw rectangle around text
         draw.rectangle([(min_x, min_y), (max_x, max_y)], outline="blue", width=2)
-        
+
         # Draw index number
         draw.text((min_x, min_y - 20), f"#{index}: {text[:20]}", fill="blue", font=font)
-        
-        # Highlight search text, start text, or end text if provided
-        if (search_text and search_text in text) or (start_text and start_text in text) or (end_text and end_text in text):
-            draw.rectangle([(min_x, min_y), (max_x, max_y)], outline="red", width=3)
-            
-    # Save the image with bounding boxes
-    datetime_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    annotated_image_path = os.path.join(ocr_dir, f"ocr_annotated_{datetime_str}.png")
-    image.save(annotated_image_path)
-    
-    # Convert to base64 for sending to LLM
+
+    _annotated_cache = (screenshot.digest, source, image)
+    return image
+
+
+def _merge_rects(rects):
+    """
+    Merges overlapping `(x0, y0, x1, y1)` rectangles until none overlap.
+    """
+    merged = []
+    for rect in sorted(rects):
+        for i, other in enumerate(merged):
+            if rect[0] <= other[2] and other[0] <= rect[2] and rect[1] <= other[3] and other[1] <= rect[3]:
+                merged[i] = (
+                    min(rect[0], other[0]),
+                    min(rect[1], other[1]),
+                    max(rect[2], other[2]),
+                    max(rect[3], other[3]),
+                )
+                return _merge_rects(merged[:i] + merged[i + 1 :] + [merged[i]])
+        merged.append(rect)
+    return merged
+
+
+def create_candidate_image(result, screenshot, indices, padding=48, max_width=1280):
+    """
+    Builds the disambiguation image sent to the LLM: tight crops of the annotated
+    frame around the candidate boxes, stacked vertically, instead of the whole
+    annotated screen. Candidates are outlined in red. Without candidates the
+    full annotated frame is sent, scaled down to `max_width`.
+
+    Args:
+        result (OCRResult): The OCR result for the frame.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+        indices (list): Indices into `result` of the candidate boxes.
+        padding (int): Context kept around each box, enough for its index label.
+        max_width (int): Width the image is scaled down to if wider.
+
+    Returns:
+        str: The image, PNG encoded as base64.
+    """
+    annotated = create_annotated_ocr_image(result, screenshot)
+    result = as_ocr_result(result)
+    width, height = screenshot.size
+
+    if indices:
+        boxes = result.xyxy[list(indices)].tolist()
+        rects = _merge_rects(
+            [
+                (
+                    max(int(x0) - padding, 0),
+                    max(int(y0) - padding, 0),
+                    min(int(x1) + padding, width),
+                    min(int(y1) + padding, height),
+                )
+                for x0, y0, x1, y1 in boxes
+            ]
+        )
+        crops = []
+        for rect in rects:
+            crop = annotated.crop(rect)
+            draw = ImageDraw.Draw(crop)
+            for x0, y0, x1, y1 in boxes:
+                draw.rectangle(
+                    [(x0 - rect[0], y0 - rect[1]), (x1 - rect[0], y1 - rect[1])],
+                    outline="red",
+                    width=3,
+                )
+            crops.append(crop)
+
+        gap = 8
+        image = Image.new(
+            "RGB",
+            (max(crop.width for crop in crops), sum(crop.height for crop in crops) + gap * (len(crops) - 1)),
+            "white",
+        )
+        y = 0
+        for crop in crops:
+            image.paste(crop, (0, y))
+            y += crop.height + gap
+    else:
+        image = annotated
+
+    if image.width > max_width:
+        image = image.resize(
+            (max_width, round(image.height * max_width / image.width)), Image.Resampling.LANCZOS
+        )
+
     buffered = io.BytesIO()
     image.save(buffered, format="PNG")
     img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    
+
     if config.verbose:
-        print(f"[create_annotated_ocr_image] OCR annotated image saved at: {annotated_image_path}")
-    
-    return annotated_image_path, img_base64
+        print(
+            f"[create_candidate_image] {len(indices)} candidates, {image.width}x{image.height} "
+            f"image of {len(buffered.getvalue()) // 1024} KB instead of the {width}x{height} frame"
+        )
+    return img_base64
 
 
-def ask_llm_for_text_index_with_retry(client, result, search_text, annotated_image_base64, max_retries=3):
+async def ask_llm_for_targets_with_retry(client, result, questions, annotated_image_base64, max_retries=3, deadline=None):
     """
-    Asks the LLM to identify the correct index for a text element with retry logic.
-    
+    Asks the LLM to resolve every ambiguous text target of a step in a single call.
+
+    Retries back off exponentially with full jitter, without blocking the event loop.
+    All attempts and waits share the step's `deadline`: a request still running when
+    it passes is cancelled, and no retry is started that could not finish in time.
+
     Args:
-        client: The initialized LLM client
+        client: The initialized async LLM client (`Config.initialize_openai_async`)
         result (list): The list of results returned by EasyOCR
-        search_text (str): The text to search for
-        annotated_image_base64 (str): Base64 encoded annotated image
+        questions (list): The unresolved targets, see `resolve_text_targets`
+        annotated_image_base64 (str): Base64 encoded crops around the candidates
         max_retries (int): Maximum number of retry attempts
-        
+        deadline (float, optional): Event loop time by which the step must be grounded
+
+    Raises:
+        asyncio.TimeoutError: If the deadline passes before an answer arrives.
+
     Returns:
-        int: The index of the text element identified by the LLM
+        dict: Maps each question's position in `questions` to the index the LLM chose,
+            or None if it found no suitable element for it.
     """
     # Create a list of text elements with their indices
     text_elements = []
     for i, element in enumerate(result):
         text_elements.append(f"#{i}: {element[1]}")
-    
+
     text_elements_str = "\n".join(text_elements)
-    
+
+    targets = []
+    for number, question in enumerate(questions, 1):
+        candidates = ", ".join(f"#{index}" for index in question["candidates"])
+        if question["kind"] == "choose":
+            targets.append(
+                f'{number}. "{question["text"]}": several elements contain this text ({candidates}). '
+                "Choose the one that appears to be the most relevant UI element (like a button, link, or menu item)."
+            )
+        else:
+            targets.append(
+                f'{number}. "{question["text"]}": no exact match was found. Choose the element that best matches it, '
+                "considering semantic similarity, partial matches, or UI elements that might serve the same purpose"
+                + (f" (closest candidates: {candidates})" if candidates else "")
+                + ". Answer null if you don't see ANY reasonable match."
+            )
+    targets_str = "\n".join(targets)
+    example = ", ".join(f'"{number}": 0' for number in range(1, len(questions) + 1))
+
     # Create the prompt for the LLM
     prompt = f"""
-    I need to identify the correct text element to interact with on this screen.
-    
-    I'm looking for: "{search_text}"
-    
+    I need to identify the correct text elements to interact with on this screen.
+
     Here are all the text elements detected on the screen (with their indices):
     {text_elements_str}
-    
-    Look at the annotated image where each text element is marked with its index.
-    Which index number (just the number) contains the text I'm looking for?
-    If there are multiple matches, choose the one that appears to be the most relevant UI element (like a button, link, or menu item).
-    
-    Return ONLY the index number, nothing else.
-    """
-    
+
+    Look at the image: crops of the screen around the candidate elements, each marked with its index.
+
+    These are the targets I'm looking for:
+    {targets_str}
+
+    Return ONLY a JSON object mapping every target number to an index number (or null), like this: {{{example}}}
+    """
+
+    loop = asyncio.get_running_loop()
     retries = 0
     while retries < max_retries:
         try:
-            # Send the request to the LLM
-            response = client.chat.completions.create(
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError("grounding deadline exceeded")
+
+            # Send the request to the LLM, cancelled if it outlives the deadline
+            request = client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that identifies UI elements in screenshots."},
+                    {"role": "system", "content": "You are a helpful assistant that identifies UI elements in screenshots. You only respond with JSON."},
                     {"role": "user", "content": [
                         {"type": "text", "text": prompt},
                         {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{annotated_image_base64}"}}
                     ]}
                 ],
                 temperature=0.1,
-                max_tokens=10  # We only need a short response
+                max_tokens=20 + 10 * len(questions)  # We only need a short response
             )
-            
-            # Extract the index from the response
-            index_str = response.choices[0].message.content.strip()
-            
-            # Clean up the response to get just the number
-            index_str = ''.join(c for c in index_str if c.isdigit())
-            
-            if not index_str:
-                raise ValueError("LLM did not return a valid index number")
-            
-            return int(index_str)
-            
+            try:
+                response = await asyncio.wait_for(request, timeout=remaining)
+            except asyncio.TimeoutError:
+                _match_stats["deadline_exceeded"] += 1
+                raise
+            _match_stats["llm_calls"] += 1
+
+            return parse_target_answers(response.choices[0].message.content, len(questions))
+
         except Exception as e:
             retries += 1
             if config.verbose:
-                print(f"[ask_llm_for_text_index_with_retry] Attempt {retries} failed: {e}")
-            
-            if retries >= max_retries:
+                print(f"[ask_llm_for_targets_with_retry] Attempt {retries} failed: {e}")
+
+            if retries >= max_retries or isinstance(e, asyncio.TimeoutError):
                 if config.verbose:
-                    print(f"[ask_llm_for_text_index_with_retry] All {max_retries} attempts failed")
+                    print(f"[ask_llm_for_targets_with_retry] Giving up after {retries} attempts")
                 raise
-            
-            # Wait before retrying (exponential backoff)
-            time.sleep(2 ** retries)
-    
+
+            # Wait before retrying (exponential backoff with full jitter)
+            delay = random.uniform(0, 2 ** retries)
+            if deadline is not None and loop.time() + delay >= deadline:
+                _match_stats["deadline_exceeded"] += 1
+                raise asyncio.TimeoutError("no time left in the grounding deadline for a retry")
+            await asyncio.sleep(delay)
+
     # This should never be reached due to the raise in the loop
-    raise Exception("Failed to get valid index from LLM after retries")
+    raise Exception("Failed to get valid indices from LLM after retries")
 
 
-def ask_llm_for_best_match_with_retry(client, result, search_text, annotated_image_base64, max_retries=3):
+def parse_target_answers(response_text, count):
     """
-    Asks the LLM to find the best matching text element when exact search text is not found.
-    
-    Args:
-        client: The initialized LLM client
-        result (list): The list of results returned by EasyOCR
-        search_text (str): The text that was searched for but not found exactly
-        annotated_image_base64 (str): Base64 encoded annotated image
-        max_retries (int): Maximum number of retry attempts
-        
-    Returns:
-        int or None: The index of the best matching text element identified by the LLM,
-                    or None if no suitable match is found
+    Parses the LLM's `{"1": 3, "2": null}` answer into `{0: 3, 1: None}`.
+
+    Raises:
+        ValueError: If the answer is not a JSON object covering every target.
     """
-    # Create a list of text elements with their indices
-    text_elements = []
-    for i, element in enumerate(result):
-        text_elements.append(f"#{i}: {element[1]}")
-    
-    text_elements_str = "\n".join(text_elements)
-    
-    # Create the prompt for the LLM
-    prompt = f"""
-    I need to find the best matching text element on this screen.
-    
-    I was looking for: "{search_text}" but couldn't find an exact match.
-    
-    Here are all the text elements detected on the screen (with their indices):
-    {text_elements_str}
-    
-    Look at the annotated image where each text element is marked with its index.
-    Which index number (just the number) contains text that best matches what I'm looking for?
-    
-    Consider semantic similarity, partial matches, or UI elements that might serve the same purpose.
-    
-    If you don't see ANY reasonable match, respond with "NONE".
-    Otherwise, return ONLY the index number of the best match.
-    """
-    
-    retries = 0
-    while retries < max_retries:
-        try:
-            # Send the request to the LLM
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that identifies UI elements in screenshots. You only respond with a number or NONE."},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{annotated_image_base64}"}}
-                    ]}
-                ],
-                temperature=0.1,
-                max_tokens=10  # We only need a short response
-            )
-            
-            # Extract the response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Check if the LLM found no match
-            if response_text.upper() == "NONE":
-                if config.verbose:
-                    print(f"[ask_llm_for_best_match_with_retry] LLM found no suitable match")
-                return None
-            
-            # Clean up the response to get just the number
-            index_str = ''.join(c for c in response_text if c.isdigit())
-            
+    response_text = response_text.strip()
+    start, end = response_text.find("{"), response_text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError(f"LLM did not return a JSON object: {response_text}")
+    answers = json.loads(response_text[start : end + 1])
+
+    parsed = {}
+    for number in range(1, count + 1):
+        if str(number) not in answers:
+            raise ValueError(f"LLM did not answer target {number}: {response_text}")
+        value = answers[str(number)]
+        if value is None or str(value).strip().upper() in ("", "NONE", "NULL"):
+            parsed[number - 1] = None
+        else:
+            index_str = "".join(c for c in str(value) if c.isdigit())
             if not index_str:
-                raise ValueError("LLM did not return a valid index number")
-            
-            selected_index = int(index_str)
-            
-            # Verify the selected index is valid
-            if selected_index >= len(result):
-                raise ValueError(f"LLM returned invalid index {selected_index}")
-                
-            if config.verbose:
-                print(f"[ask_llm_for_best_match_with_retry] LLM selected index: {selected_index} with text: '{result[selected_index][1]}'")
-                
-            return selected_index
-            
-        except Exception as e:
-            retries += 1
-            if config.verbose:
-                print(f"[ask_llm_for_best_match_with_retry] Attempt {retries} failed: {e}")
-            
-            if retries >= max_retries:
-                if config.verbose:
-                    print(f"[ask_llm_for_best_match_with_retry] All {max_retries} attempts failed")
-                return None
-            
-            # Wait before retrying (exponential backoff)
-            time.sleep(2 ** retries)
-    
-    # This should never be reached due to the return None in the loop
-    return None
+                raise ValueError(f"LLM returned an invalid index for target {number}: {value}")
+            parsed[number - 1] = int(index_str)
+    return parsed
 
 
-def get_text_element(result, search_text, image_path, client=None):
+def _resolve_locally(result, search_text, screenshot, client, record=True, element_map=None):
     """
-    Searches for a text element in the OCR results and returns its index.
-    If multiple matches are found and a client is provided, uses LLM to select the best one.
-    If no exact match is found and a client is provided, uses LLM to find the best approximate match.
-    
-    Args:
-        result (list): The list of results returned by EasyOCR.
-        search_text (str): The text to search for in the OCR results.
-        image_path (str): Path to the original image.
-        client (optional): OpenAI client for LLM assistance if multiple matches are found.
+    Resolves one text target without a model call where possible.
 
     Returns:
-        int: The index of the element containing the search text.
+        tuple: `(index, None)` when resolved, or `(None, question)` when only the LLM
+            can decide. A question is a dict with the `text`, its `kind` ("choose"
+            between duplicates or best "match"), the `candidates` to show and the
+            `fallback` index used if the LLM gives no usable answer.
 
     Raises:
-        Exception: If the text element is not found in the results and no alternative can be found.
+        Exception: If the text is not found and there is no client to ask.
     """
+    # Probing a region is not a lookup of its own, keep it out of the match stats
+    stats = _match_stats if record else dict.fromkeys(_match_stats, 0)
     if config.verbose:
-        print("[get_text_element]")
         print("[get_text_element] search_text", search_text)
 
     # Find all matching indices
@@ -294,311 +390,436 @@ def get_text_element(result, search_text, image_path, client=None):
 
     # If we have matches, process them
     if matching_indices:
-        # If we have only one match or no client, return the first match
-        if len(matching_indices) == 1 or client is None:
-            return matching_indices[0]
-        
-        # If we have multiple matches and a client, use LLM to select the best one
-        try:
-            # Create annotated image with all text elements
-            _, annotated_image_base64 = create_annotated_ocr_image(
-                result, image_path, search_text=search_text
-            )
-            
-            # Ask LLM to identify the correct index with retry logic
-            selected_index = ask_llm_for_text_index_with_retry(
-                client, result, search_text, annotated_image_base64
-            )
-            
-            if config.verbose:
-                print(f"[get_text_element] LLM selected index: {selected_index}")
-            
-            # Verify the selected index is valid
-            if selected_index >= len(result):
-                if config.verbose:
-                    print(f"[get_text_element] LLM selected invalid index {selected_index}, falling back to first match")
-                return matching_indices[0]
-            
-            # Verify the selected text contains the search text
-            selected_text = result[selected_index][1]
-            if search_text not in selected_text:
-                if config.verbose:
-                    print(f"[get_text_element] LLM selected index {selected_index} with text '{selected_text}' which doesn't contain '{search_text}', falling back to first match")
-                return matching_indices[0]
-            
-            return selected_index
-            
-        except Exception as e:
+        stats["exact"] += 1
+        if len(matching_indices) == 1:
+            return matching_indices[0], None
+
+        # Rank the duplicates locally; the LLM only breaks ties it cannot
+        ranked = rank_candidates(
+            get_text_index(result), matching_indices, search_text, screenshot, element_map
+        )
+        if client is None or is_decisive(ranked):
+            stats["ranked"] += 1
             if config.verbose:
-                print(f"[get_text_element] Error in LLM selection: {e}")
-                print(f"[get_text_element] Falling back to first match: {matching_indices[0]}")
-            return matching_indices[0]
-    
-    # No exact matches found
+                print(f"[get_text_element] ranked duplicates locally, index: {ranked[0][0]}")
+            return ranked[0][0], None
+
+        # The top candidates are indistinguishable, the LLM has to choose
+        stats["tiebreak"] += 1
+        candidates = [index for index, _ in ranked]
+        return None, {
+            "text": search_text,
+            "kind": "choose",
+            "candidates": candidates[:MAX_CANDIDATE_CROPS],
+            "fallback": candidates[0],
+        }
+
+    # The text may be split over several boxes on one line, e.g. "Sign in" + "with Google"
+    phrase_indices = [
+        index for index in get_text_index(result).find(search_text) if index >= len(result)
+    ]
+    if phrase_indices:
+        stats["phrase"] += 1
+        if config.verbose:
+            print(f"[get_text_element] found search_text across boxes, index: {phrase_indices[0]}")
+        return phrase_indices[0], None
+
+    # No exact matches found, try to resolve casing differences and OCR typos locally
+    local_index = find_local_match(result, search_text)
+    if local_index is not None:
+        stats["local"] += 1
+        return local_index, None
+
     if client is None:
         # Without a client, we can't find alternatives
+        stats["not_found"] += 1
         raise Exception(f"The text element '{search_text}' was not found in the image")
-    
-    # With a client, try to find the best approximate match
+
+    # With a client, ask the LLM for the best approximate match
+    stats["llm"] += 1
     if config.verbose:
         print(f"[get_text_element] No exact match found for '{search_text}', asking LLM for best match")
-    
-    try:
-        # Create annotated image with all text elements
-        _, annotated_image_base64 = create_annotated_ocr_image(
-            result, image_path
-        )
-        
-        # Ask LLM to find the best match
-        best_match_index = ask_llm_for_best_match_with_retry(
-            client, result, search_text, annotated_image_base64
-        )
-        
-        if best_match_index is not None:
-            if config.verbose:
-                print(f"[get_text_element] LLM found best match at index {best_match_index}: '{result[best_match_index][1]}'")
-            return best_match_index
-        
-        # If LLM couldn't find a match either
-        raise Exception(f"The text element '{search_text}' was not found in the image and no suitable alternative could be identified")
-        
-    except Exception as e:
-        if config.verbose:
-            print(f"[get_text_element] Error in LLM best match selection: {e}")
-        raise Exception(f"The text element '{search_text}' was not found in the image: {str(e)}")
+    candidates = [
+        index for index, _ in get_text_index(result).search(search_text) if index < len(result)
+    ]
+    return None, {
+        "text": search_text,
+        "kind": "match",
+        "candidates": candidates[:MAX_CANDIDATE_CROPS],
+        "fallback": None,
+    }
 
 
-def get_text_coordinates(result, index, image_path):
+async def resolve_text_targets(result, texts, screenshot, client=None, deadline=None, element_map=None):
     """
-    Gets the coordinates of the text element at the specified index as a percentage of screen width and height.
+    Maps several text targets of one step to OCR elements.
+
+    Each target is resolved locally when possible (exact, phrase, fuzzy and ranked
+    matches). All the targets that are still ambiguous are sent to the LLM together
+    in a single call, so a step with N ambiguous targets costs one extra call, not N.
+
     Args:
         result (list): The list of results returned by EasyOCR.
-        index (int): The index of the text element in the results list.
-        image_path (str): Path to the screenshot image.
+        texts (list): The texts to look for. Duplicates are resolved once.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+        client (optional): Async OpenAI client for LLM assistance with ambiguous targets.
+        deadline (float, optional): Event loop time after which the LLM is no longer
+            waited for and the ambiguous targets fall back to their best local candidate.
+        element_map (ElementMap, optional): The frame's element map, built on `result`.
+            Duplicates sitting on a detected control are ranked first.
 
     Returns:
-        dict: A dictionary containing the 'x' and 'y' coordinates as percentages of the screen width and height.
+        list: The element index for each text, in order. Indices past the end of
+            `result` refer to phrases assembled from several boxes, which
+            `get_text_coordinates` resolves to their union box.
+
+    Raises:
+        Exception: If a text element is not found and no alternative can be found.
     """
-    if index >= len(result):
-        raise Exception("Index out of range in OCR results")
+    resolved = {}
+    questions = []
+    for text in dict.fromkeys(texts):
+        index, question = _resolve_locally(
+            result, text, screenshot, client, element_map=element_map
+        )
+        if question is None:
+            resolved[text] = index
+        else:
+            questions.append(question)
 
-    # Get the bounding box of the text element
-    bounding_box = result[index][0]
+    if questions:
+        if config.verbose:
+            print(f"[resolve_text_targets] asking LLM about {len(questions)} targets in one call")
+        candidates = list(
+            dict.fromkeys(index for question in questions for index in question["candidates"])
+        )
+        try:
+            # Crops of the annotated frame around every question's candidates
+            annotated_image_base64 = create_candidate_image(
+                result, screenshot, candidates[: MAX_CANDIDATE_CROPS * 2]
+            )
+            answers = await ask_llm_for_targets_with_retry(
+                client, result, questions, annotated_image_base64, deadline=deadline
+            )
+        except Exception as e:
+            if config.verbose:
+                print(f"[resolve_text_targets] Error in LLM selection: {e}")
+            answers = {}
 
-    # Calculate the center of the bounding box
-    min_x = min([coord[0] for coord in bounding_box])
-    max_x = max([coord[0] for coord in bounding_box])
-    min_y = min([coord[1] for coord in bounding_box])
-    max_y = max([coord[1] for coord in bounding_box])
+        for position, question in enumerate(questions):
+            text = question["text"]
+            selected_index = answers.get(position)
+            if config.verbose:
+                print(f"[resolve_text_targets] LLM selected index {selected_index} for '{text}'")
 
-    center_x = (min_x + max_x) / 2
-    center_y = (min_y + max_y) / 2
+            # Verify the selected index is valid
+            if selected_index is not None and selected_index >= len(result):
+                if config.verbose:
+                    print(f"[resolve_text_targets] LLM selected invalid index {selected_index}")
+                selected_index = None
 
-    # Get image dimensions
-    with Image.open(image_path) as img:
-        width, height = img.size
+            # Verify the selected text contains the search text
+            if (
+                selected_index is not None
+                and question["kind"] == "choose"
+                and text not in result[selected_index][1]
+            ):
+                if config.verbose:
+                    print(f"[resolve_text_targets] LLM selected index {selected_index} with text '{result[selected_index][1]}' which doesn't contain '{text}'")
+                selected_index = None
 
-    # Convert to percentages
-    percent_x = round((center_x / width), 3)
-    percent_y = round((center_y / height), 3)
+            if selected_index is None:
+                selected_index = question["fallback"]
+            if selected_index is None:
+                _match_stats["not_found"] += 1
+                raise Exception(f"The text element '{text}' was not found in the image and no suitable alternative could be identified")
+            resolved[text] = selected_index
 
-    return {"x": percent_x, "y": percent_y}
+    return [resolved[text] for text in texts]
 
 
-def ask_llm_for_drag_drop_indices_with_retry(client, result, start_text, end_text, annotated_image_base64, max_retries=3):
+async def get_text_element(result, search_text, screenshot, client=None, element_map=None):
     """
-    Asks the LLM to identify the correct indices for drag and drop operation with retry logic.
-    
+    Searches for a text element in the OCR results and returns its index.
+    If multiple matches are found they are ranked locally (see `rank_candidates`), and only
+    if the top candidates are too close to call and a client is provided, uses LLM to select
+    the best one.
+    If no exact match is found, the local text index is tried first, and only if its best
+    candidate is below `config.ocr_match_threshold` and a client is provided, uses LLM to
+    find the best approximate match.
+
+    To resolve several targets with at most one LLM call, use `resolve_text_targets`.
+
     Args:
-        client: The initialized LLM client
-        result (list): The list of results returned by EasyOCR
-        start_text (str): The text at the starting point
-        end_text (str): The text at the ending point
-        annotated_image_base64 (str): Base64 encoded annotated image
-        max_retries (int): Maximum number of retry attempts
-        
+        result (list): The list of results returned by EasyOCR.
+        search_text (str): The text to search for in the OCR results.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+        client (optional): Async OpenAI client for LLM assistance if multiple matches are found.
+        element_map (ElementMap, optional): The frame's element map, built on `result`.
+
     Returns:
-        tuple: (start_index, end_index) identified by the LLM
+        int: The index of the element containing the search text. Indices past the end
+            of `result` refer to phrases assembled from several boxes, which
+            `get_text_coordinates` resolves to their union box.
+
+    Raises:
+        Exception: If the text element is not found in the results and no alternative can be found.
     """
-    # Create a list of text elements with their indices
-    text_elements = []
-    for i, element in enumerate(result):
-        text_elements.append(f"#{i}: {element[1]}")
-    
-    text_elements_str = "\n".join(text_elements)
-    
-    # Create the prompt for the LLM
-    prompt = f"""
-    I need to identify the correct text elements for a drag and drop operation on this screen.
-    
-    I need to drag from: "{start_text}"
-    And drop onto: "{end_text}"
-    
-    Here are all the text elements detected on the screen (with their indices):
-    {text_elements_str}
-    
-    Look at the annotated image where each text element is marked with its index.
-    Which index number contains the starting text, and which index number contains the ending text?
-    
-    Return ONLY the two index numbers separated by a comma, like this: "3,7"
+    if config.verbose:
+        print("[get_text_element]")
+    return (
+        await resolve_text_targets(
+            result, [search_text], screenshot, client, element_map=element_map
+        )
+    )[0]
+
+
+def get_text_coordinates(result, index, screenshot):
     """
-    
-    retries = 0
-    while retries < max_retries:
-        try:
-            # Send the request to the LLM
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that identifies UI elements in screenshots."},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{annotated_image_base64}"}}
-                    ]}
-                ],
-                temperature=0.1,
-                max_tokens=10  # We only need a short response
-            )
-            
-            # Extract the indices from the response
-            indices_str = response.choices[0].message.content.strip()
-            
-            # Parse the response to get the two indices
-            parts = indices_str.split(',')
-            if len(parts) != 2:
-                raise ValueError(f"LLM did not return two indices separated by comma: {indices_str}")
-                
-            start_index = int(''.join(c for c in parts[0] if c.isdigit()))
-            end_index = int(''.join(c for c in parts[1] if c.isdigit()))
-            
-            return start_index, end_index
-            
-        except Exception as e:
-            retries += 1
-            if config.verbose:
-                print(f"[ask_llm_for_drag_drop_indices_with_retry] Attempt {retries} failed: {e}")
-            
-            if retries >= max_retries:
-                if config.verbose:
-                    print(f"[ask_llm_for_drag_drop_indices_with_retry] All {max_retries} attempts failed")
-                raise
-            
-            # Wait before retrying (exponential backoff)
-            time.sleep(2 ** retries)
-    
-    # This should never be reached due to the raise in the loop
-    raise Exception("Failed to get valid indices from LLM after retries")
+    Gets the coordinates of the text element at the specified index as a percentage of screen width and height.
+    Args:
+        result (list): The list of results returned by EasyOCR.
+        index (int): The index of the text element in the results list.
+        screenshot (Screenshot): The captured frame the OCR ran on.
+
+    Returns:
+        dict: A dictionary containing the 'x' and 'y' coordinates as percentages of the screen width and height.
+    """
+    text_index = get_text_index(result)
+    if index >= len(text_index.elements):
+        raise Exception("Index out of range in OCR results")
+
+    # Center of the bounding box (the union box for an assembled phrase) as percentages
+    percent_x, percent_y = text_index.elements.percent_center(index, screenshot.size)
+
+    return {"x": percent_x, "y": percent_y}
 
 
-def get_drag_drop_text_coordinates(result, start_text, end_text, image_path, client=None):
+async def get_drag_drop_text_coordinates(result, start_text, end_text, screenshot, client=None, element_map=None):
     """
     Gets the coordinates for a drag and drop operation between two text elements.
-    If multiple matches are found, uses LLM to select the best ones.
-    
+    Both texts are resolved like `get_text_element`, with at most one LLM call for both.
+
     Args:
         result (list): The list of results returned by EasyOCR.
         start_text (str): The text at the starting point.
         end_text (str): The text at the ending point.
-        image_path (str): Path to the screenshot image.
-        client (optional): OpenAI client for LLM assistance if multiple matches are found.
-        
+        screenshot (Screenshot): The captured frame the OCR ran on.
+        client (optional): Async OpenAI client for LLM assistance if multiple matches are found.
+        element_map (ElementMap, optional): The frame's element map, built on `result`.
+
     Returns:
         dict: A dictionary containing start_x, start_y, end_x, end_y as percentages.
     """
-    # Find all matching indices
-    start_indices = []
-    end_indices = []
-    
-    for index, element in enumerate(result):
-        text = element[1]
-        
-        if start_text in text:
-            start_indices.append(index)
-            
-        if end_text in text:
-            end_indices.append(index)
-    
-    if not start_indices:
-        raise Exception(f"Could not find start text element: '{start_text}'")
-    
-    if not end_indices:
-        raise Exception(f"Could not find end text element: '{end_text}'")
-    
-    # If we have multiple matches and a client is provided, use LLM to select the best ones
-    start_index = start_indices[0]  # Default to first match
-    end_index = end_indices[0]      # Default to first match
-    
-    if (len(start_indices) > 1 or len(end_indices) > 1) and client:
-        try:
-            # Create annotated image with all text elements
-            annotated_image_path, img_base64 = create_annotated_ocr_image(
-                result, image_path, start_text=start_text, end_text=end_text
-            )
-            
-            # Ask LLM to identify the correct indices with retry logic
-            start_index, end_index = ask_llm_for_drag_drop_indices_with_retry(
-                client, result, start_text, end_text, img_base64
-            )
-            
-            if config.verbose:
-                print(f"[get_drag_drop_text_coordinates] LLM selected indices: {start_index}, {end_index}")
-            
-            # Verify the indices are valid
-            if start_index >= len(result) or end_index >= len(result):
-                if config.verbose:
-                    print(f"[get_drag_drop_text_coordinates] LLM selected invalid indices {start_index}, {end_index}, falling back to first matches")
-                start_index = start_indices[0]
-                end_index = end_indices[0]
-            
-            # Verify the selected texts contain the search texts
-            start_selected_text = result[start_index][1]
-            end_selected_text = result[end_index][1]
-            
-            if start_text not in start_selected_text or end_text not in end_selected_text:
-                if config.verbose:
-                    print(f"[get_drag_drop_text_coordinates] LLM selected texts don't match search criteria, falling back to first matches")
-                start_index = start_indices[0]
-                end_index = end_indices[0]
-        
-        except Exception as e:
-            if config.verbose:
-                print(f"[get_drag_drop_text_coordinates] Error in LLM selection: {e}")
-                print(f"[get_drag_drop_text_coordinates] Falling back to first matches: {start_index}, {end_index}")
-    
-    # Get the bounding boxes
-    start_box = result[start_index][0]
-    end_box = result[end_index][0]
-    
-    # Calculate the centers
-    start_min_x = min([coord[0] for coord in start_box])
-    start_max_x = max([coord[0] for coord in start_box])
-    start_min_y = min([coord[1] for coord in start_box])
-    start_max_y = max([coord[1] for coord in start_box])
-    
-    end_min_x = min([coord[0] for coord in end_box])
-    end_max_x = max([coord[0] for coord in end_box])
-    end_min_y = min([coord[1] for coord in end_box])
-    end_max_y = max([coord[1] for coord in end_box])
-    
-    start_center_x = (start_min_x + start_max_x) / 2
-    start_center_y = (start_min_y + start_max_y) / 2
-    
-    end_center_x = (end_min_x + end_max_x) / 2
-    end_center_y = (end_min_y + end_max_y) / 2
-    
-    # Get image dimensions
-    with Image.open(image_path) as img:
-        width, height = img.size
-    
-    # Convert to percentages
-    start_percent_x = round((start_center_x / width), 3)
-    start_percent_y = round((start_center_y / height), 3)
-    end_percent_x = round((end_center_x / width), 3)
-    end_percent_y = round((end_center_y / height), 3)
-    
+    start_index, end_index = await resolve_text_targets(
+        result, [start_text, end_text], screenshot, client, element_map=element_map
+    )
+    return get_drag_drop_coordinates(result, start_index, end_index, screenshot)
+
+
+def get_drag_drop_coordinates(result, start_index, end_index, screenshot):
+    """
+    Gets the centers of two resolved text elements as percentages of the screen.
+    """
+    elements = get_text_index(result).elements
+    start_percent_x, start_percent_y = elements.percent_center(start_index, screenshot.size)
+    end_percent_x, end_percent_y = elements.percent_center(end_index, screenshot.size)
+
     return {
         "start_x": start_percent_x,
         "start_y": start_percent_y,
         "end_x": end_percent_x,
         "end_y": end_percent_y
     }
+
+
+def region_rect(hint, size, scale):
+    """
+    Turns a model's region hint into a pixel rectangle around it.
+
+    Args:
+        hint (dict): `{"x": ..., "y": ...}`, the approximate location of the text
+            as fractions of the screen.
+        size (tuple): Frame `(width, height)`.
+        scale (float): Rectangle size as a fraction of the frame's width and height.
+
+    Returns:
+        tuple or None: `(x0, y0, x1, y1)` clamped to the frame, or None if the hint
+            is missing or malformed.
+    """
+    try:
+        x, y = float(hint["x"]), float(hint["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    width, height = size
+    half_width, half_height = scale * width / 2, scale * height / 2
+    center_x = min(max(x, 0.0), 1.0) * width
+    center_y = min(max(y, 0.0), 1.0) * height
+    return (
+        int(max(center_x - half_width, 0)),
+        int(max(center_y - half_height, 0)),
+        int(min(center_x + half_width, width)),
+        int(min(center_y + half_height, height)),
+    )
+
+
+async def find_in_region(ocr_job, search_text, hint, screenshot):
+    """
+    Looks for a text target around the region the model pointed at, running OCR on
+    that crop only and widening it through `config.ocr_region_scales` if nothing
+    matches.
+
+    Returns:
+        dict or None: The `x`/`y` coordinates as percentages, or None if the text was
+            not found in any crop or the full-frame OCR is already under way.
+    """
+    for scale in config.ocr_region_scales:
+        rect = region_rect(hint, screenshot.size, scale)
+        if rect is None:
+            return None
+        region_result = await ocr_job.region_result(rect)
+        if region_result is None:
+            return None
+        try:
+            index, question = _resolve_locally(
+                region_result, search_text, screenshot, None, record=False
+            )
+        except Exception:
+            continue
+        if question is None:
+            _match_stats["region"] += 1
+            if config.verbose:
+                print(f"[find_in_region] found '{search_text}' in region {rect}")
+            return get_text_coordinates(region_result, index, screenshot)
+    return None
+
+
+def find_on_hinted_control(element_map, search_text, hint):
+    """
+    Looks for a text target on the control under the model's region hint, using
+    the element map of a frame that was read in full.
+
+    Returns:
+        int or None: The index of the first element on that control containing the
+            search text, or None if there is no hint, no control under it or no
+            matching text on it.
+    """
+    try:
+        x, y = float(hint["x"]), float(hint["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    label = element_map.at_point(x, y)
+    if label is None:
+        return None
+    for index, on_label in element_map.find_text(search_text):
+        if on_label == label:
+            _match_stats["control"] += 1
+            if config.verbose:
+                print(
+                    f"[find_on_hinted_control] found '{search_text}' on control {label} "
+                    f"'{element_map.text_of(label)}'"
+                )
+            return index
+    return None
+
+
+async def ground_operations(operations, ocr_job, screenshot, client=None, operation_types=("click", "drag")):
+    """
+    Adds screen coordinates to every text-targeted operation of a step.
+
+    When every target comes with a region hint, they are first looked for by
+    running OCR on those parts of the screen only, ahead of any prefetched
+    full-frame pass that has not started yet. The full frame is read only for the
+    remaining targets. With `config.ocr_element_map` the set-of-marks detector
+    runs while that pass finishes, and a hinted target is taken from the control
+    under its hint when the text is there. The rest are resolved together by
+    `resolve_text_targets`, so however many clicks and drags are ambiguous, the
+    step costs at most one extra LLM call.
+
+    Args:
+        operations (list): The operations returned by the model. Click operations get
+            `x`/`y` from their `text` (and optional `region`), drag operations get
+            `start_x`/`start_y`/`end_x`/`end_y` from their `start_text` and `end_text`
+            (and optional `start_region`/`end_region`). Updated in place.
+        ocr_job (OCRJob): The OCR job for the step's frame.
+        screenshot (Screenshot): The captured frame.
+        client (optional): Async OpenAI client for LLM assistance with ambiguous targets.
+        operation_types (tuple): Which operation types to ground.
+
+    Returns:
+        list: The same operations.
+    """
+    targets = []
+    for operation in operations:
+        if operation.get("operation") not in operation_types:
+            continue
+        if operation.get("operation") == "click":
+            targets.append((operation.get("text"), operation.get("region")))
+        elif operation.get("operation") == "drag":
+            targets.append((operation.get("start_text"), operation.get("start_region")))
+            targets.append((operation.get("end_text"), operation.get("end_region")))
+
+    if not targets:
+        ocr_job.skip()
+        return operations
+
+    # Region reads only pay off when they replace the full-frame pass: a target
+    # without a hint needs that pass anyway, and one already running is no slower
+    # to wait for than region reads queued behind it
+    hinted = all(hint is not None for _, hint in targets)
+    use_regions = hinted and ocr_job.defer()
+    points = [None] * len(targets)
+    if use_regions:
+        for position, (text, hint) in enumerate(targets):
+            points[position] = await find_in_region(ocr_job, text, hint, screenshot)
+
+    missing = [position for position, point in enumerate(points) if point is None]
+    if not missing:
+        # Every target was found in its region, the full-frame pass is not needed
+        ocr_job.finish_with_regions()
+    else:
+        detector = get_som_detector() if config.ocr_element_map else None
+        element_map = await build_element_map(
+            screenshot, detector, ocr_job, prefetch_next=not hinted or use_regions
+        )
+        result = element_map.result
+
+        unresolved = []
+        for position in missing:
+            text, hint = targets[position]
+            index = None if hint is None else find_on_hinted_control(element_map, text, hint)
+            if index is None:
+                unresolved.append(position)
+            else:
+                points[position] = get_text_coordinates(result, index, screenshot)
+
+        # One budget for the whole step, shared by every retry of the LLM call
+        deadline = asyncio.get_running_loop().time() + config.grounding_timeout
+        indices = await resolve_text_targets(
+            result,
+            [targets[position][0] for position in unresolved],
+            screenshot,
+            client,
+            deadline,
+            element_map=element_map,
+        )
+        for position, index in zip(unresolved, indices):
+            points[position] = get_text_coordinates(result, index, screenshot)
+
+    points = iter(points)
+    for operation in operations:
+        if operation.get("operation") not in operation_types:
+            continue
+        if operation.get("operation") == "click":
+            coordinates = next(points)
+            operation["x"] = coordinates["x"]
+            operation["y"] = coordinates["y"]
+        elif operation.get("operation") == "drag":
+            start, end = next(points), next(points)
+            operation["start_x"], operation["start_y"] = start["x"], start["y"]
+            operation["end_x"], operation["end_y"] = end["x"], end["y"]
+
+        if config.verbose:
+            print("[ground_operations] final operation", operation)
+
+    return operations
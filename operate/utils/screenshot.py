@@ -1,42 +1,203 @@
+import base64
+import hashlib
+import io
 import os
 import platform
 import subprocess
+import tempfile
+import threading
+
+import numpy as np
 import pyautogui
 from PIL import Image, ImageDraw, ImageGrab
 import Xlib.display
 import Xlib.X
 import Xlib.Xutil  # not sure if Xutil is necessary
 
+from operate.config import Config
+from operate.utils.x11_capture import X11ShmCapture
+
+# Load configuration
+config = Config()
+
+# Linux capture state, opened on the first grab and reused for the whole session
+_x11_capture = None
+_x11_display = None
+
+
+class Screenshot:
+    """
+    An in-memory screen capture shared by every stage of a step.
+
+    The pixels are held once and every derived form (numpy array, encoded bytes,
+    base64 payloads) is computed lazily on first use and cached, so OCR, the
+    detector, the LLM payload and the coordinate math never touch the disk.
+
+    Attributes:
+        image (PIL.Image.Image): The RGB frame.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+    """
+
+    def __init__(self, image):
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        self.image = image
+        self.width, self.height = image.size
+        self._pixels = None
+        self._digest = None
+        self._encoded = {}
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def pixels(self):
+        """
+        The frame as a read-only `(height, width, 3)` uint8 RGB numpy array.
+        """
+        if self._pixels is None:
+            pixels = np.asarray(self.image)
+            pixels.flags.writeable = False
+            self._pixels = pixels
+        return self._pixels
+
+    @property
+    def digest(self):
+        """
+        Exact content hash of the frame, usable as a cache key across frames.
+        """
+        if self._digest is None:
+            pixels = self.pixels
+            self._digest = hashlib.blake2b(
+                np.ascontiguousarray(pixels), digest_size=16
+            ).hexdigest() + f"-{self.width}x{self.height}"
+        return self._digest
+
+    def encode(self, format="PNG", width=None, **params):
+        """
+        Encodes the frame, optionally resized to `width` keeping the aspect ratio.
+
+        Args:
+            format (str): PIL image format, e.g. "PNG" or "JPEG".
+            width (int, optional): Target width in pixels.
+            **params: Forwarded to `PIL.Image.save`, e.g. `quality=85`.
+
+        Returns:
+            bytes: The encoded image, cached per format, width and params.
+        """
+        key = (format, width, tuple(sorted(params.items())))
+        if key not in self._encoded:
+            image = self.image
+            if width and width != self.width:
+                height = int(width / (self.width / self.height))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format=format, **params)
+            self._encoded[key] = buffer.getvalue()
+        return self._encoded[key]
 
-def capture_screen_with_cursor(file_path):
+    def to_base64(self, format="PNG", width=None, **params):
+        """
+        Returns the encoded frame as a base64 string for model payloads.
+        """
+        return base64.b64encode(self.encode(format, width, **params)).decode("utf-8")
+
+    def save(self, file_path):
+        """
+        Writes the frame to disk in a background thread.
+        """
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        threading.Thread(target=self.image.save, args=(file_path,)).start()
+
+
+def _open_x11_capture():
+    """
+    Opens the XShm backend, or the `ImageGrab` display connection if XShm is
+    unavailable. Returns the XShm backend or None.
+    """
+    global _x11_display
+    try:
+        return X11ShmCapture()
+    except OSError as e:
+        if config.verbose:
+            print("[capture_screen_with_cursor] XShm unavailable, using ImageGrab:", e)
+        _x11_display = Xlib.display.Display()
+        return None
+
+
+def _grab_linux():
+    """
+    Grabs the X11 root window through a persistent XShm backend, falling back to
+    `ImageGrab` over a single reused Xlib connection when XShm is unavailable.
+
+    A grab the server rejects (e.g. after a resolution change) re-attaches the
+    XShm buffer once, and falls back to `ImageGrab` if that fails too.
+    """
+    global _x11_capture, _x11_display
+
+    if _x11_capture is None and _x11_display is None:
+        _x11_capture = _open_x11_capture()
+
+    if _x11_capture is not None:
+        try:
+            return _x11_capture.grab_image()
+        except OSError as e:
+            if config.verbose:
+                print("[capture_screen_with_cursor] XShm grab failed, re-attaching:", e)
+            _x11_capture.close()
+            _x11_capture = _open_x11_capture()
+            if _x11_capture is not None:
+                try:
+                    return _x11_capture.grab_image()
+                except OSError as e:
+                    if config.verbose:
+                        print("[capture_screen_with_cursor] XShm grab failed, using ImageGrab:", e)
+                    _x11_capture.close()
+                    _x11_capture = None
+                    _x11_display = Xlib.display.Display()
+
+    # Use xlib to prevent scrot dependency for Linux
+    screen = _x11_display.screen()
+    size = screen.width_in_pixels, screen.height_in_pixels
+    return ImageGrab.grab(bbox=(0, 0, size[0], size[1]))
+
+
+def capture_screen_with_cursor(file_path=None):
+    """
+    Captures the screen into memory.
+
+    Args:
+        file_path (str, optional): If given, the frame is also written there.
+
+    Returns:
+        Screenshot: The captured frame, or None on an unsupported platform.
+    """
     user_platform = platform.system()
 
     if user_platform == "Windows":
         screenshot = pyautogui.screenshot()
-        screenshot.save(file_path)
     elif user_platform == "Linux":
-        # Use xlib to prevent scrot dependency for Linux
-        screen = Xlib.display.Display().screen()
-        size = screen.width_in_pixels, screen.height_in_pixels
-        screenshot = ImageGrab.grab(bbox=(0, 0, size[0], size[1]))
-        screenshot.save(file_path)
+        screenshot = _grab_linux()
     elif user_platform == "Darwin":  # (Mac OS)
-        # Use the screencapture utility to capture the screen with the cursor
-        subprocess.run(["screencapture", "-C", file_path])
+        # `screencapture` can only write to a file, so read it back and drop it
+        fd, temp_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            # Use the screencapture utility to capture the screen with the cursor
+            subprocess.run(["screencapture", "-C", temp_path])
+            with Image.open(temp_path) as img:
+                screenshot = img.convert("RGB")
+        finally:
+            os.remove(temp_path)
     else:
         print(f"The platform you're using ({user_platform}) is not currently supported")
+        return None
 
-
-def compress_screenshot(raw_screenshot_filename, screenshot_filename):
-    with Image.open(raw_screenshot_filename) as img:
-        # Check if the image has an alpha channel (transparency)
-        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-            # Create a white background image
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            # Paste the image onto the background, using the alpha channel as mask
-            background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-            # Save the result as JPEG
-            background.save(screenshot_filename, 'JPEG', quality=85)  # Adjust quality as needed
-        else:
-            # If no alpha channel, simply convert and save
-            img.convert('RGB').save(screenshot_filename, 'JPEG', quality=85)
+    frame = Screenshot(screenshot)
+    if file_path:
+        frame.save(file_path)
+    return frame
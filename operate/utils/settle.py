@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+from PIL import Image
+
+from operate.config import Config
+from operate.utils.screenshot import capture_screen_with_cursor
+
+# Load configuration
+config = Config()
+
+# Signature of the last frame seen, so a capture right after a settle can reuse it
+_last_signature = None
+_stats = {}
+
+
+def frame_signature(screenshot, size=(64, 36)):
+    """
+    Returns a cheap low-resolution grayscale signature of a frame.
+
+    Args:
+        screenshot (Screenshot): The captured frame.
+        size (tuple): Signature resolution (width, height).
+
+    Returns:
+        numpy.ndarray: A `(height, width)` uint8 array.
+    """
+    small = screenshot.image.convert("L").resize(size, Image.Resampling.BOX)
+    return np.asarray(small)
+
+
+def signatures_match(a, b, tolerance=None):
+    """
+    Two signatures match when only a tiny fraction of their cells changed, so a
+    blinking caret or a clock tick does not keep the screen "unsettled".
+    """
+    if a is None or b is None or a.shape != b.shape:
+        return False
+    if tolerance is None:
+        tolerance = config.settle_tolerance
+    changed = np.abs(a.astype(np.int16) - b.astype(np.int16)) > 8
+    return changed.mean() <= tolerance
+
+
+def get_settle_limits(operation_type=None):
+    """
+    Returns the settle limits for an operation type, falling back to "default".
+    """
+    limits = dict(config.settle_limits["default"])
+    limits.update(config.settle_limits.get(operation_type, {}))
+    return limits
+
+
+def wait_for_screen_settle(operation_type=None):
+    """
+    Polls the screen until `stable_frames` consecutive frames match or the
+    operation type's `timeout` expires, starting after its `min_delay`.
+
+    After an operation the frames are compared among themselves only: a frame
+    grabbed before the action rendered would match the pre-action signature and
+    end the wait at once. The "capture" wait may reuse the signature left by the
+    previous wait, which was taken after that action settled.
+
+    Args:
+        operation_type (str, optional): e.g. "click", "write", "press", "drag"
+            or "capture". Selects the limits from `config.settle_limits`.
+
+    Returns:
+        Screenshot: The last frame captured, ready to be used as the step screenshot.
+    """
+    global _last_signature
+
+    limits = get_settle_limits(operation_type)
+    start = time.perf_counter()
+    deadline = start + limits["timeout"]
+
+    time.sleep(limits["min_delay"])
+
+    previous = _last_signature if operation_type == "capture" else None
+    matches = 0
+    frames = 0
+    while True:
+        screenshot = capture_screen_with_cursor()
+        signature = frame_signature(screenshot)
+        frames += 1
+
+        matches = matches + 1 if signatures_match(previous, signature) else 0
+        previous = signature
+        settled = matches >= limits["stable_frames"] - 1
+        if settled or time.perf_counter() >= deadline:
+            break
+        time.sleep(limits["interval"])
+
+    _last_signature = signature
+    elapsed = time.perf_counter() - start
+
+    key = operation_type or "default"
+    stats = _stats.setdefault(
+        key, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "timeouts": 0}
+    )
+    stats["count"] += 1
+    stats["total_seconds"] += elapsed
+    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+    if not settled:
+        stats["timeouts"] += 1
+
+    if config.verbose:
+        print(
+            f"[wait_for_screen_settle] {key} {'settled' if settled else 'timed out'} "
+            f"in {elapsed:.2f}s ({frames} frames)"
+        )
+    return screenshot
+
+
+def get_settle_stats():
+    """
+    Returns how long settling took per operation type.
+    """
+    return {key: dict(stats) for key, stats in _stats.items()}
@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+from operate.models.ocr_result import OCRResult, as_ocr_result
+from operate.utils.text_layout import assemble_phrases
+
+# Index of the most recent OCR result, reused by every lookup on the same frame
+_text_index_cache = (None, None)
+
+
+def normalize_text(text):
+    """
+    Case-folds, applies NFKC and collapses whitespace so "Sign  In" == "sign in".
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def compact_text(text):
+    """
+    Normalized text with spaces and punctuation removed, for OCR that merges or
+    splits words ("Signin" vs "Sign in") or misreads punctuation.
+    """
+    return re.sub(r"[\W_]+", "", normalize_text(text))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance between two strings.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def substring_edit_distance(query, text):
+    """
+    Smallest edit distance between `query` and any substring of `text`, so a
+    short target can match inside a longer OCR line.
+    """
+    previous = [0] * (len(text) + 1)
+    for i, char_q in enumerate(query, 1):
+        current = [i]
+        for j, char_t in enumerate(text, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_q != char_t),
+                )
+            )
+        previous = current
+    return min(previous)
+
+
+def similarity(query, text):
+    """
+    Scores how well `query` matches `text`, both already compacted, from 0 to 1.
+    """
+    if not query or not text:
+        return 0.0
+    if query == text:
+        return 1.0
+    if query in text:
+        # Containment is as good as the old substring check, slightly below exact
+        return 0.95
+    whole = 1 - edit_distance(query, text) / max(len(query), len(text))
+    partial = 1 - substring_edit_distance(query, text) / len(query)
+    # A partial match inside a much longer line is weaker evidence
+    partial *= min(1.0, 0.6 + 0.4 * len(query) / len(text))
+    return max(whole, partial, 0.0)
+
+
+class OCRTextIndex:
+    """
+    Per-frame index over OCR text for local lookups.
+
+    Holds normalized and compacted forms of every OCR text, an inverted token
+    index and a trigram index. `search` ranks candidates by edit-distance
+    similarity so casing differences and OCR typos resolve without a model call.
+
+    Besides the OCR boxes themselves, the index holds the phrases assembled
+    from neighbouring boxes on a line. Indices below `len(result)` are the
+    original boxes; the ones after them are assembled spans.
+    `elements` is an OCRResult over both, so geometry lookups are vectorized.
+
+    Args:
+        result (OCRResult): The OCR result, a plain EasyOCR list is converted.
+    """
+
+    def __init__(self, result):
+        result = as_ocr_result(result)
+        self.size = len(result)
+        spans = assemble_phrases(result)
+        self.elements = result.concat(OCRResult([element for _, element in spans]))
+        self.texts = self.elements.texts
+        self.normalized = [normalize_text(text) for text in self.texts]
+        self.compacted = [compact_text(text) for text in self.texts]
+        self.tokens = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        for index, (normalized, compacted) in enumerate(
+            zip(self.normalized, self.compacted)
+        ):
+            for token in normalized.split(" "):
+                self.tokens[token].add(index)
+            for gram in trigrams(compacted):
+                self.trigrams[gram].add(index)
+
+    def candidates(self, query, limit=20):
+        """
+        Returns the indices sharing the most tokens and trigrams with the query.
+        """
+        votes = defaultdict(int)
+        for token in normalize_text(query).split(" "):
+            for index in self.tokens.get(token, ()):
+                votes[index] += 3
+        for gram in trigrams(compact_text(query)):
+            for index in self.trigrams.get(gram, ()):
+                votes[index] += 1
+        return sorted(votes, key=lambda index: (-votes[index], index))[:limit]
+
+    def search(self, query, limit=20):
+        """
+        Ranks OCR elements against the query.
+
+        Returns:
+            list: `(index, score)` pairs, best first, scores from 0 to 1.
+        """
+        compacted = compact_text(query)
+        scored = [
+            (index, similarity(compacted, self.compacted[index]))
+            for index in self.candidates(query, limit)
+        ]
+        return sorted(scored, key=lambda pair: (-pair[1], pair[0]))
+
+    def find(self, search_text):
+        """
+        Returns every index, boxes first then spans, whose text contains the
+        search text exactly, as the plain substring check on single boxes does.
+        """
+        return [index for index, text in enumerate(self.texts) if search_text in text]
+
+
+def get_text_index(result):
+    """
+    Returns the text index for an OCR result, building it once per frame.
+    """
+    global _text_index_cache
+    cached_result, text_index = _text_index_cache
+    if cached_result is not result:
+        text_index = OCRTextIndex(result)
+        _text_index_cache = (result, text_index)
+    return text_index
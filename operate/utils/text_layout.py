@@ -0,0 +1,109 @@
+from operate.models.ocr_result import as_ocr_result
+
+
+def group_lines(result, center_tolerance=0.5, max_height_ratio=2.0):
+    """
+    Groups OCR boxes into text lines.
+
+    Two boxes share a line when their vertical centers are within
+    `center_tolerance` of the smaller height and their heights are comparable,
+    so a heading is not merged with the small print next to it.
+
+    Args:
+        result (OCRResult): The OCR result.
+
+    Returns:
+        list: One list of result indices per line, each sorted left to right.
+    """
+    bounds = as_ocr_result(result).xyxy.tolist()
+    order = sorted(range(len(result)), key=lambda i: ((bounds[i][1] + bounds[i][3]) / 2, bounds[i][0]))
+
+    lines = []  # [center_y, height, indices]
+    for index in order:
+        x0, y0, x1, y1 = bounds[index]
+        height = max(y1 - y0, 1)
+        center = (y0 + y1) / 2
+        for line in lines:
+            line_center, line_height, members = line
+            if (
+                abs(center - line_center) <= center_tolerance * min(height, line_height)
+                and max(height, line_height) <= max_height_ratio * min(height, line_height)
+            ):
+                members.append(index)
+                # Running average keeps a long line from drifting on one tall box
+                line[0] = (line_center * (len(members) - 1) + center) / len(members)
+                line[1] = (line_height * (len(members) - 1) + height) / len(members)
+                break
+        else:
+            lines.append([center, height, [index]])
+
+    return [sorted(members, key=lambda i: bounds[i][0]) for _, _, members in lines]
+
+
+def split_phrases(bounds, line, gap_factor=1.0):
+    """
+    Splits a line into phrases wherever the horizontal gap between two
+    neighbouring boxes is wider than `gap_factor` times the text height, so
+    separate buttons or columns on one row are not read as one phrase.
+
+    Args:
+        bounds (list): `(x0, y0, x1, y1)` of every box in the result.
+        line (list): Result indices of one line, left to right.
+
+    Returns:
+        list: One list of result indices per phrase.
+    """
+    phrases = []
+    previous = None
+    for index in line:
+        x0, y0, x1, y1 = bounds[index]
+        if previous is not None:
+            px0, py0, px1, py1 = previous
+            gap = x0 - px1
+            if gap <= gap_factor * max(y1 - y0, py1 - py0, 1):
+                phrases[-1].append(index)
+                previous = (px0, min(py0, y0), max(px1, x1), max(py1, y1))
+                continue
+        phrases.append([index])
+        previous = (x0, y0, x1, y1)
+    return phrases
+
+
+def union_element(result, indices):
+    """
+    Builds a synthetic OCR element covering several boxes: the union box, the
+    texts joined with spaces and the lowest confidence of the members.
+    """
+    bounds = result.xyxy[list(indices)]
+    x0, y0 = bounds[:, :2].min(axis=0).tolist()
+    x1, y1 = bounds[:, 2:].max(axis=0).tolist()
+    text = " ".join(result[i][1] for i in indices)
+    confidence = min(result[i][2] for i in indices)
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, confidence
+
+
+def assemble_phrases(result, max_span=6):
+    """
+    Assembles multi-box spans out of OCR boxes that EasyOCR split apart, e.g.
+    "Sign in" + "with Google" or the parts of a menu path.
+
+    Every contiguous run of 2 to `max_span` boxes inside a phrase becomes a span.
+
+    Args:
+        result (OCRResult): The OCR result.
+        max_span (int): Longest run of boxes joined into one span.
+
+    Returns:
+        list: `(indices, element)` pairs, where `indices` are the member boxes
+            and `element` is the union `(box, text, confidence)`.
+    """
+    result = as_ocr_result(result)
+    bounds = result.xyxy.tolist()
+    spans = []
+    for line in group_lines(result):
+        for phrase in split_phrases(bounds, line):
+            for start in range(len(phrase)):
+                for end in range(start + 2, min(start + max_span, len(phrase)) + 1):
+                    indices = tuple(phrase[start:end])
+                    spans.append((indices, union_element(result, indices)))
+    return spans
@@ -0,0 +1,286 @@
+import ctypes
+import ctypes.util
+
+import numpy as np
+from PIL import Image
+
+from operate.config import Config
+
+# Load configuration
+config = Config()
+
+ZPIXMAP = 2
+ALL_PLANES = ctypes.c_ulong(-1).value
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+
+class XImage(ctypes.Structure):
+    # Only the leading fields are declared, the struct is always allocated by Xlib
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+    ]
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if not path:
+        raise OSError(f"lib{name} not found")
+    return ctypes.CDLL(path)
+
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+def _bind(lib, name, restype, argtypes):
+    function = getattr(lib, name)
+    function.restype = restype
+    function.argtypes = argtypes
+    return function
+
+
+class X11ShmCapture:
+    """
+    Long-lived X11 screen grabber that keeps one display connection open and
+    copies the root window into a MIT-SHM segment shared with the X server.
+
+    Each `grab()` refreshes the same shared buffer in place, so no pixels cross
+    the X socket and no memory is allocated per frame.
+
+    Raises:
+        OSError: If the display cannot be opened or XShm is not available
+            (e.g. on a remote or forwarded display).
+    """
+
+    def __init__(self, display_name=None):
+        self._display = None
+        self._ximage = None
+        self._ximage_attached = False
+        self._shminfo = XShmSegmentInfo()
+        self._shminfo.shmid = -1
+        self._raw = None
+        self._buffer = None
+        self._error_handler = None
+        self._errors = []
+
+        self._xlib = _load_library("X11")
+        self._xext = _load_library("Xext")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._bind_functions()
+
+        self._display = self._XOpenDisplay(
+            display_name.encode() if display_name else None
+        )
+        if not self._display:
+            raise OSError(f"Cannot open X display {display_name or ''}".strip())
+
+        try:
+            if not self._XShmQueryExtension(self._display):
+                raise OSError("X server does not support the MIT-SHM extension")
+            self._attach()
+        except Exception:
+            self.close()
+            raise
+
+    def _bind_functions(self):
+        c_void_p, c_int, c_uint = ctypes.c_void_p, ctypes.c_int, ctypes.c_uint
+        ximage_p = ctypes.POINTER(XImage)
+        shminfo_p = ctypes.POINTER(XShmSegmentInfo)
+
+        self._XOpenDisplay = _bind(self._xlib, "XOpenDisplay", c_void_p, [ctypes.c_char_p])
+        self._XCloseDisplay = _bind(self._xlib, "XCloseDisplay", c_int, [c_void_p])
+        self._XDefaultScreen = _bind(self._xlib, "XDefaultScreen", c_int, [c_void_p])
+        self._XDefaultRootWindow = _bind(
+            self._xlib, "XDefaultRootWindow", ctypes.c_ulong, [c_void_p]
+        )
+        self._XDefaultVisual = _bind(self._xlib, "XDefaultVisual", c_void_p, [c_void_p, c_int])
+        self._XDefaultDepth = _bind(self._xlib, "XDefaultDepth", c_int, [c_void_p, c_int])
+        self._XDisplayWidth = _bind(self._xlib, "XDisplayWidth", c_int, [c_void_p, c_int])
+        self._XDisplayHeight = _bind(self._xlib, "XDisplayHeight", c_int, [c_void_p, c_int])
+        self._XSync = _bind(self._xlib, "XSync", c_int, [c_void_p, c_int])
+        self._XFree = _bind(self._xlib, "XFree", c_int, [c_void_p])
+        self._XSetErrorHandler = _bind(
+            self._xlib, "XSetErrorHandler", c_void_p, [X_ERROR_HANDLER]
+        )
+
+        self._XShmQueryExtension = _bind(self._xext, "XShmQueryExtension", c_int, [c_void_p])
+        self._XShmCreateImage = _bind(
+            self._xext,
+            "XShmCreateImage",
+            ximage_p,
+            [c_void_p, c_void_p, c_uint, c_int, c_void_p, shminfo_p, c_uint, c_uint],
+        )
+        self._XShmAttach = _bind(self._xext, "XShmAttach", c_int, [c_void_p, shminfo_p])
+        self._XShmDetach = _bind(self._xext, "XShmDetach", c_int, [c_void_p, shminfo_p])
+        self._XShmGetImage = _bind(
+            self._xext,
+            "XShmGetImage",
+            c_int,
+            [c_void_p, ctypes.c_ulong, ximage_p, c_int, c_int, ctypes.c_ulong],
+        )
+
+        self._shmget = _bind(self._libc, "shmget", c_int, [c_int, ctypes.c_size_t, c_int])
+        self._shmat = _bind(self._libc, "shmat", c_void_p, [c_int, c_void_p, c_int])
+        self._shmdt = _bind(self._libc, "shmdt", c_int, [c_void_p])
+        self._shmctl = _bind(self._libc, "shmctl", c_int, [c_int, c_int, c_void_p])
+
+    def _attach(self):
+        screen = self._XDefaultScreen(self._display)
+        self._root = self._XDefaultRootWindow(self._display)
+        self.width = self._XDisplayWidth(self._display, screen)
+        self.height = self._XDisplayHeight(self._display, screen)
+
+        self._ximage = self._XShmCreateImage(
+            self._display,
+            self._XDefaultVisual(self._display, screen),
+            self._XDefaultDepth(self._display, screen),
+            ZPIXMAP,
+            None,
+            ctypes.byref(self._shminfo),
+            self.width,
+            self.height,
+        )
+        if not self._ximage:
+            raise OSError("XShmCreateImage failed")
+
+        ximage = self._ximage.contents
+        if ximage.bits_per_pixel != 32:
+            raise OSError(f"Unsupported pixel depth {ximage.bits_per_pixel} bpp")
+        self._stride = ximage.bytes_per_line
+        size = self._stride * self.height
+
+        self._shminfo.shmid = self._shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if self._shminfo.shmid < 0:
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        address = self._shmat(self._shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        self._shminfo.shmaddr = address
+        self._shminfo.readOnly = 0
+        ximage.data = address
+
+        # Xlib's default error handler exits the process. A server that advertises
+        # XShm can still refuse the attach (e.g. over a forwarded display), and a
+        # later XShmGetImage can fail with BadMatch (e.g. after a resolution
+        # change), so a non-fatal handler stays installed until `close()`
+        self._install_error_handler()
+        del self._errors[:]
+        attached = self._XShmAttach(self._display, ctypes.byref(self._shminfo))
+        self._XSync(self._display, 0)
+        if not attached or self._errors:
+            self._ximage_attached = False
+            raise OSError("XShmAttach failed")
+        self._ximage_attached = True
+        # Mark the segment for removal now, it lives until both sides detach
+        self._shmctl(self._shminfo.shmid, IPC_RMID, None)
+        self._shminfo.shmid = -1
+
+        self._raw = np.ctypeslib.as_array((ctypes.c_ubyte * size).from_address(address))
+        self._buffer = self._raw.reshape(self.height, self._stride // 4, 4)[
+            :, : self.width
+        ]
+
+        if config.verbose:
+            print(f"[X11ShmCapture] attached {self.width}x{self.height} shared-memory buffer")
+
+    def _install_error_handler(self):
+        self._errors = []
+
+        def on_error(display, event):
+            self._errors.append(event)
+            return 0
+
+        self._error_handler = X_ERROR_HANDLER(on_error)
+        self._previous_error_handler = self._XSetErrorHandler(self._error_handler)
+
+    def _restore_error_handler(self):
+        if self._error_handler is not None:
+            self._XSetErrorHandler(ctypes.cast(self._previous_error_handler, X_ERROR_HANDLER))
+            self._error_handler = None
+
+    def grab(self):
+        """
+        Refreshes the shared buffer with the current screen contents.
+
+        Returns:
+            numpy.ndarray: A `(height, width, 4)` BGRX view of the shared buffer.
+                It is overwritten by the next grab, copy it to keep a frame.
+
+        Raises:
+            OSError: If the server rejects the grab, e.g. with BadMatch after
+                the screen resolution changed.
+        """
+        del self._errors[:]
+        if (
+            not self._XShmGetImage(self._display, self._root, self._ximage, 0, 0, ALL_PLANES)
+            or self._errors
+        ):
+            raise OSError("XShmGetImage failed")
+        return self._buffer
+
+    def grab_image(self):
+        """
+        Grabs the screen and converts the shared buffer into an RGB PIL image.
+        """
+        self.grab()
+        return Image.frombuffer(
+            "RGB",
+            (self.width, self.height),
+            self._raw,
+            "raw",
+            "BGRX",
+            self._stride,
+            1,
+        )
+
+    def close(self):
+        if self._display and self._ximage_attached:
+            self._ximage_attached = False
+            self._XShmDetach(self._display, ctypes.byref(self._shminfo))
+            self._XSync(self._display, 0)
+        if self._shminfo.shmaddr:
+            self._shmdt(self._shminfo.shmaddr)
+            self._shminfo.shmaddr = None
+        if self._shminfo.shmid >= 0:
+            self._shmctl(self._shminfo.shmid, IPC_RMID, None)
+            self._shminfo.shmid = -1
+        if self._ximage:
+            # The pixel data belongs to the shared segment, only free the struct
+            self._XFree(self._ximage)
+            self._ximage = None
+        if self._display:
+            self._XCloseDisplay(self._display)
+            self._display = None
+        self._restore_error_handler()
+        self._raw = None
+        self._buffer = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass